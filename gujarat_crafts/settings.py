@@ -57,6 +57,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'store.context_processors.categories',
+                'store.context_processors.cart_badge',
             ],
         },
     },
@@ -72,6 +73,22 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file, not the shared in-memory database, so the concurrency tests
+        # see SQLite's real locking (with its busy timeout)
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+
+# Cache
+# Local memory is per process; point this at a shared backend (Redis, Memcached)
+# in production so version bumps reach every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -129,3 +146,7 @@ AUTH_USER_MODEL = 'store.User'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 
+
+# Order numbers (store/order_numbers.py) embed this host id next to the
+# process id; give every host serving checkouts a different value (0-1295)
+ORDER_NUMBER_NODE_ID = 0
@@ -1,17 +1,20 @@
 """
 URL configuration for gujarat_crafts project.
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from store.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('store.urls')),
+    # Uploaded media, with Range and conditional GET support in every environment;
+    # a CDN or front-end server can still take MEDIA_URL over in front of it
+    re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.*)$', serve_media, name='media'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    # Static files are handled by Django's development server when DEBUG=True
-
+# Static files are handled by Django's development server when DEBUG=True
@@ -124,6 +124,85 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     enableDesktopDropdowns();
+
+    // Search suggestions
+    const searchInput = document.querySelector('.search-input[data-autocomplete-url]');
+    const suggestionList = document.getElementById('searchSuggestions');
+    let suggestionTimer = null;
+    let activeSuggestion = -1;
+
+    function hideSuggestions() {
+        if (suggestionList) {
+            suggestionList.hidden = true;
+            suggestionList.innerHTML = '';
+            activeSuggestion = -1;
+        }
+    }
+
+    function renderSuggestions(results) {
+        suggestionList.innerHTML = '';
+        activeSuggestion = -1;
+        results.forEach(result => {
+            const item = document.createElement('li');
+            const link = document.createElement('a');
+            const label = document.createElement('span');
+            const type = document.createElement('span');
+            link.href = result.url;
+            label.textContent = result.label;
+            type.textContent = result.type;
+            type.className = 'suggestion-type';
+            link.appendChild(label);
+            link.appendChild(type);
+            item.appendChild(link);
+            suggestionList.appendChild(item);
+        });
+        suggestionList.hidden = results.length === 0;
+    }
+
+    if (searchInput && suggestionList) {
+        searchInput.addEventListener('input', function() {
+            clearTimeout(suggestionTimer);
+            const query = this.value.trim();
+            if (!query) {
+                hideSuggestions();
+                return;
+            }
+            suggestionTimer = setTimeout(() => {
+                fetch(searchInput.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query))
+                    .then(response => response.json())
+                    .then(data => {
+                        if (searchInput.value.trim() === query) {
+                            renderSuggestions(data.results);
+                        }
+                    })
+                    .catch(hideSuggestions);
+            }, 120);
+        });
+
+        searchInput.addEventListener('keydown', function(e) {
+            const links = suggestionList.querySelectorAll('a');
+            if (suggestionList.hidden || !links.length) {
+                return;
+            }
+            if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+                e.preventDefault();
+                const step = e.key === 'ArrowDown' ? 1 : -1;
+                activeSuggestion = (activeSuggestion + step + links.length) % links.length;
+                links.forEach((link, i) => link.classList.toggle('active', i === activeSuggestion));
+            } else if (e.key === 'Enter' && activeSuggestion >= 0) {
+                e.preventDefault();
+                window.location.href = links[activeSuggestion].href;
+            } else if (e.key === 'Escape') {
+                hideSuggestions();
+            }
+        });
+
+        document.addEventListener('click', function(e) {
+            if (!suggestionList.contains(e.target) && e.target !== searchInput) {
+                hideSuggestions();
+            }
+        });
+    }
 });
 
 // Form validation
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Category, Product, ProductImage, ProductVideo, Cart, Wishlist, Order, OrderItem, Review
+from .models import User, Category, Product, ProductImage, ProductVideo, Cart, CheckoutSubmission, ChunkedUpload, DailyProductSales, ImportCheckpoint, StockReservation, Wishlist, Order, OrderItem, Review
 
 
 @admin.register(User)
@@ -46,6 +46,24 @@ class CartAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
 
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['user', 'product', 'quantity', 'expires_at']
+    list_filter = ['expires_at']
+
+
+@admin.register(ChunkedUpload)
+class ChunkedUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'user', 'product', 'kind', 'received', 'size', 'completed_at', 'updated_at']
+    list_filter = ['kind', 'completed_at']
+
+
+@admin.register(ImportCheckpoint)
+class ImportCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['name', 'rows_done', 'created', 'images', 'failed', 'updated_at']
+    search_fields = ['name', 'source']
+
+
 @admin.register(Wishlist)
 class WishlistAdmin(admin.ModelAdmin):
     list_display = ['user', 'product', 'created_at']
@@ -66,3 +84,15 @@ class OrderAdmin(admin.ModelAdmin):
     inlines = [OrderItemInline]
     readonly_fields = ['order_number', 'created_at']
 
+
+@admin.register(CheckoutSubmission)
+class CheckoutSubmissionAdmin(admin.ModelAdmin):
+    list_display = ['key', 'user', 'order', 'created_at']
+    search_fields = ['key', 'user__username', 'order__order_number']
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    list_display = ['day', 'seller', 'product', 'units', 'revenue']
+    list_filter = ['day']
+    search_fields = ['seller__username', 'product__name']
@@ -0,0 +1,198 @@
+"""
+In-process typeahead index of approved product names and category names.
+
+Each entry is stored once and reachable through a sorted list of
+(word-suffix key, entry id) pairs, so "pot" finds both "Pottery" and
+"Clay pot". Lookups are a bisect plus a short forward scan and never touch
+the database. Signals keep the index of the current process in sync; every
+process also rebuilds it from the database after REFRESH_SECONDS to pick up
+changes made elsewhere. Only the first build in a process runs on a request
+(concurrent requests wait for that one build); later rebuilds run on a
+background thread while lookups keep using the current index.
+
+Categories are few and always indexed; products share the remaining slots
+by sales.
+"""
+import bisect
+import logging
+import threading
+import time
+
+from django.db import connections
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+# Memory bound: lower-scoring products are dropped first when the index is full
+MAX_ENTRIES = 20000
+MAX_LABEL_LENGTH = 80
+MAX_WORDS_PER_ENTRY = 8
+REFRESH_SECONDS = 300
+
+# Stop scanning after this many key matches for very short prefixes like "a"
+MAX_SCAN = 400
+
+
+def normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Sorted word-suffix keys over a bounded set of (kind, ref) entries"""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.keys = []
+        self.built_at = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _entry_keys(self, entry_id, label):
+        words = normalize(label).split(' ')[:MAX_WORDS_PER_ENTRY]
+        return [(' '.join(words[i:]), entry_id) for i in range(len(words))]
+
+    def _remove(self, entry_id):
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in self._entry_keys(entry_id, entry[0]):
+            position = bisect.bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+    def _add(self, entry_id, label, score):
+        label = label[:MAX_LABEL_LENGTH]
+        self._remove(entry_id)
+        if len(self.entries) >= self.max_entries:
+            # Only products are evicted; a category always gets in
+            products = [key for key in self.entries if key[0] != 'category']
+            lowest_id = min(products, key=lambda key: self.entries[key][1], default=None)
+            if lowest_id is None:
+                return
+            if entry_id[0] != 'category' and self.entries[lowest_id][1] >= score:
+                return
+            self._remove(lowest_id)
+        self.entries[entry_id] = (label, score)
+        for key in self._entry_keys(entry_id, label):
+            bisect.insort(self.keys, key)
+
+    def add(self, kind, ref, label, score=0):
+        with self.lock:
+            self._add((kind, ref), label, score)
+
+    def remove(self, kind, ref):
+        with self.lock:
+            self._remove((kind, ref))
+
+    def replace_all(self, items):
+        """Rebuild from (kind, ref, label, score) tuples: every category, then the highest-scoring products"""
+        categories = [item for item in items if item[0] == 'category'][:self.max_entries]
+        products = sorted((item for item in items if item[0] != 'category'), key=lambda item: item[3], reverse=True)
+        items = categories + products[:self.max_entries - len(categories)]
+        entries = {}
+        keys = []
+        for kind, ref, label, score in items:
+            entry_id = (kind, ref)
+            label = label[:MAX_LABEL_LENGTH]
+            entries[entry_id] = (label, score)
+            keys.extend(self._entry_keys(entry_id, label))
+        keys.sort()
+        with self.lock:
+            self.entries = entries
+            self.keys = keys
+            self.built_at = time.monotonic()
+
+    def lookup(self, prefix, limit=8):
+        """Best-scoring entries with a word starting with prefix: [(kind, ref, label)]"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found = {}
+        with self.lock:
+            position = bisect.bisect_left(self.keys, (prefix,))
+            end = min(len(self.keys), position + MAX_SCAN)
+            while position < end:
+                key, entry_id = self.keys[position]
+                if not key.startswith(prefix):
+                    break
+                if entry_id not in found and entry_id in self.entries:
+                    found[entry_id] = self.entries[entry_id]
+                position += 1
+        ranked = sorted(
+            found.items(),
+            # Categories first, then names that start with the prefix, then by score
+            key=lambda item: (
+                item[0][0] != 'category',
+                not normalize(item[1][0]).startswith(prefix),
+                -item[1][1],
+            ),
+        )
+        return [(kind, ref, label) for (kind, ref), (label, score) in ranked[:limit]]
+
+    def is_stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > REFRESH_SECONDS
+
+
+index = PrefixIndex()
+
+
+def load_items():
+    from .models import Category, Product
+
+    items = [('category', slug, name, 0) for slug, name in Category.objects.values_list('slug', 'name')]
+    products = Product.objects.filter(approval_status='approved').order_by('-total_sells')
+    items.extend(
+        ('product', pk, name, total_sells)
+        for pk, name, total_sells in products.values_list('id', 'name', 'total_sells')[:MAX_ENTRIES]
+    )
+    return items
+
+
+# Held while a (re)build is running, so only one runs per process
+_build_lock = threading.Lock()
+
+
+def _rebuild_in_background():
+    try:
+        index.replace_all(load_items())
+    except Exception:
+        # Keep serving the current index; the next lookup retries
+        logger.exception('Rebuilding the autocomplete index failed')
+    finally:
+        connections.close_all()
+        _build_lock.release()
+
+
+def ensure_fresh():
+    if index.built_at is None:
+        with _build_lock:
+            if index.built_at is None:
+                index.replace_all(load_items())
+    elif index.is_stale() and _build_lock.acquire(blocking=False):
+        threading.Thread(target=_rebuild_in_background, name='autocomplete-rebuild', daemon=True).start()
+
+
+def suggest(prefix, limit=8):
+    """Suggestions as dicts ready for JSON: label, type and url"""
+    ensure_fresh()
+    results = []
+    for kind, ref, label in index.lookup(prefix, limit):
+        if kind == 'category':
+            url = reverse('category_products', args=[ref])
+        else:
+            url = reverse('product_detail', args=[ref])
+        results.append({'label': label, 'type': kind, 'url': url})
+    return results
+
+
+def sync_product(product):
+    """Add approved products, drop everything else (no-op until the index is built)"""
+    if index.built_at is None:
+        return
+    if product.approval_status == 'approved':
+        index.add('product', product.pk, product.name, product.total_sells)
+    else:
+        index.remove('product', product.pk)
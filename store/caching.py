@@ -0,0 +1,227 @@
+"""
+Versioned cache helpers.
+
+A version number lives in the shared cache under "version:<name>". Cached
+values embed (or record) the versions they were built from, so bumping one
+from a signal makes every process rebuild just the affected entries, without
+deleting keys or flushing the cache.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import urlencode
+
+CATEGORIES_VERSION = 'categories'
+CATEGORIES_TIMEOUT = 60 * 60
+
+# Process-local copy of the category list: (version, categories)
+_local_categories = (None, None)
+
+
+def _initial_version():
+    # A version key can be evicted; restarting from a clock reading (not 1)
+    # never reuses a number that old entries were stored under
+    return time.time_ns()
+
+
+def get_version(name):
+    key = f'version:{name}'
+    version = cache.get(key)
+    if version is None:
+        initial = _initial_version()
+        cache.add(key, initial, None)
+        version = cache.get(key, initial)
+    return version
+
+
+def bump_version(*names):
+    for name in names:
+        key = f'version:{name}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+
+
+def cached_categories():
+    """All categories, from process memory, then the shared cache, then the DB"""
+    global _local_categories
+    from .models import Category
+
+    version = get_version(CATEGORIES_VERSION)
+    local_version, categories = _local_categories
+    if local_version == version:
+        return categories
+
+    key = f'categories:{version}'
+    categories = cache.get(key)
+    if categories is None:
+        categories = list(Category.objects.all())
+        cache.set(key, categories, CATEGORIES_TIMEOUT)
+    _local_categories = (version, categories)
+    return categories
+
+
+HOME_VERSION = 'home'
+PAGE_CACHE_SECONDS = 5 * 60
+# Stale copies are kept this long so they can be served while a page regenerates
+PAGE_CACHE_STALE_SECONDS = 24 * 60 * 60
+PAGE_LOCK_SECONDS = 30
+
+
+def category_version(category_id):
+    return f'category:{category_id}'
+
+
+def _page_cache_key(request, params):
+    # Only the parameters the view reads, in a fixed order: made-up ones
+    # (?x=1, ?x=2, ...) map to the same entry instead of filling the cache
+    query = urlencode([(name, request.GET[name]) for name in params if request.GET.get(name)])
+    digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'page:{digest}'
+
+
+def anonymous_page_cache(get_version_names, params=('page',)):
+    """Cache full pages for anonymous GETs, invalidated by version bumps.
+
+    get_version_names(request, **view_kwargs) returns the version names the
+    page depends on (or None to skip caching). `params` names every query
+    parameter the view reads; the rest are left out of the cache key. A cached copy is fresh while
+    those versions are unchanged and it is younger than PAGE_CACHE_SECONDS.
+    Otherwise one worker takes a short lock and regenerates the page while
+    the others keep serving the stale copy.
+    """
+    from .guest_cart import COOKIE_NAME as GUEST_CART_COOKIE
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # Guests with a cookie cart see their own badge in the header
+            if (request.method not in ('GET', 'HEAD') or request.user.is_authenticated
+                    or GUEST_CART_COOKIE in request.COOKIES or len(get_messages(request))):
+                return view(request, *args, **kwargs)
+            version_names = get_version_names(request, **kwargs)
+            if not version_names:
+                return view(request, *args, **kwargs)
+
+            key = _page_cache_key(request, params)
+            versions = [get_version(name) for name in version_names]
+            entry = cache.get(key)
+            if entry and entry['versions'] == versions and entry['expires'] > time.time():
+                return _cached_response(entry, 'hit')
+
+            if not cache.add(f'{key}:lock', 1, PAGE_LOCK_SECONDS):
+                if entry:
+                    return _cached_response(entry, 'stale')
+                return view(request, *args, **kwargs)
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    cache.set(key, {
+                        'versions': versions,
+                        'expires': time.time() + PAGE_CACHE_SECONDS,
+                        'content': response.content,
+                        'content_type': response['Content-Type'],
+                    }, PAGE_CACHE_STALE_SECONDS)
+                response['X-Page-Cache'] = 'miss'
+                return response
+            finally:
+                cache.delete(f'{key}:lock')
+        return wrapper
+    return decorator
+
+
+def _cached_response(entry, status):
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['X-Page-Cache'] = status
+    return response
+
+
+def home_page_versions(request):
+    return [HOME_VERSION, CATEGORIES_VERSION]
+
+
+def category_page_versions(request, category_slug):
+    category = next((category for category in cached_categories() if category.slug == category_slug), None)
+    if category is None:
+        return None
+    return [category_version(category.pk), CATEGORIES_VERSION]
+
+
+def bump_product_versions(product, deleted=False):
+    """Invalidate what a product change can affect: the home feed and the category
+    pages it is or was listed on"""
+    was_approved = getattr(product, '_loaded_approval_status', None) == 'approved'
+    is_approved = not deleted and product.approval_status == 'approved'
+    if not was_approved and not is_approved:
+        return
+    loaded_category_id = getattr(product, '_loaded_category_id', None)
+    category_ids = {product.category_id, loaded_category_id} - {None}
+    bump_version(HOME_VERSION, *(category_version(category_id) for category_id in category_ids))
+
+
+CART_SUMMARY_TIMEOUT = 10 * 60
+
+
+def _cart_summary_key(user_id):
+    return f'cart-summary:{user_id}'
+
+
+def cart_summary(user):
+    """Header badge data ({'item_count', 'total'}) for a user, cached until their cart changes.
+
+    Views that change the cart call invalidate_cart_summary(); the timeout
+    bounds how long a seller's price change can leave the total stale.
+    """
+    from .models import Cart
+
+    key = _cart_summary_key(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = Cart.objects.filter(user=user).summary()
+        cache.set(key, summary, CART_SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_cart_summary(user_id):
+    cache.delete(_cart_summary_key(user_id))
+
+
+# Order statuses that let a buyer review what they bought
+PURCHASE_STATUSES = ('confirmed', 'shipped', 'delivered')
+PURCHASE_TIMEOUT = 24 * 60 * 60
+
+
+def purchases_version(user_id):
+    return f'purchases:{user_id}'
+
+
+def _purchase_key(version, user_id, product_id):
+    return f'purchased:{version}:{user_id}:{product_id}'
+
+
+def has_purchased(user, product_id):
+    """Whether the user has an eligible order for the product, cached per (user, product).
+
+    Checkout records new purchases with mark_purchased(); any other change to
+    a user's orders bumps purchases_version(user_id) (see signals.py).
+    """
+    from .models import OrderItem
+
+    key = _purchase_key(get_version(purchases_version(user.pk)), user.pk, product_id)
+    purchased = cache.get(key)
+    if purchased is None:
+        purchased = OrderItem.objects.filter(
+            order__user=user, product_id=product_id, order__status__in=PURCHASE_STATUSES
+        ).exists()
+        cache.set(key, purchased, PURCHASE_TIMEOUT)
+    return purchased
+
+
+def mark_purchased(user_id, product_ids):
+    version = get_version(purchases_version(user_id))
+    cache.set_many({_purchase_key(version, user_id, product_id): True for product_id in product_ids}, PURCHASE_TIMEOUT)
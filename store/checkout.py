@@ -0,0 +1,197 @@
+"""
+Checkout pipeline for buy_now.
+
+Everything runs in one transaction with a fixed number of queries no matter
+how many items are in the cart: lock the products, check stock, decrement
+quantity/total_sells (and flip stock_status) in a single guarded UPDATE,
+insert the order, bulk-insert its items and add them to the daily sales
+rollup (sales.py), then clear the cart and the buyer's stock reservations.
+Units reserved by other buyers (see reservations.py) don't count as
+available.
+
+The checkout form carries an idempotency key. The first statement of the
+transaction claims it (unique index), so a double-click or a retried POST
+either finds the recorded order or waits for the concurrent attempt and
+then finds it, and never runs the stock checks or writes a second time.
+"""
+import uuid
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .caching import HOME_VERSION, bump_version, category_version, invalidate_cart_summary, mark_purchased
+from .models import Cart, CheckoutSubmission, Order, OrderItem, Product, StockReservation, held_quantity
+from .order_numbers import next_order_number
+from . import sales
+
+
+class EmptyCart(Exception):
+    pass
+
+
+class InsufficientStock(Exception):
+    """Raised with the human-readable list of items that can't be fulfilled"""
+
+    def __init__(self, items):
+        super().__init__(', '.join(items))
+        self.items = items
+
+
+def new_submission_key():
+    return uuid.uuid4().hex
+
+
+def submitted_order_id(user, key):
+    """Id of the order already placed with this idempotency key, or None"""
+    if not key:
+        return None
+    return CheckoutSubmission.objects.filter(key=key, user=user).values_list('order_id', flat=True).first()
+
+
+def _per_product(quantities, default, output):
+    """CASE id WHEN ... THEN <quantity> expression for the bulk UPDATE"""
+    return Case(
+        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        default=default,
+        output_field=output,
+    )
+
+
+def _insufficient(products, quantities):
+    return [
+        f"{product.name} (available: {max(product.available_quantity, 0)})"
+        for product_id, product in products.items()
+        if product.available_quantity < quantities[product_id] or product.stock_status == 'out_of_stock'
+    ]
+
+
+def _products(user, product_ids, lock=False):
+    products = Product.objects.with_available(exclude_user=user).only(
+        'id', 'name', 'price', 'quantity', 'stock_status', 'category_id', 'approval_status', 'seller_id'
+    )
+    if lock:
+        products = products.select_for_update(of=('self',))
+    return products.in_bulk(product_ids)
+
+
+# Attempts at a fresh order number when one is already taken (e.g. by a
+# misconfigured host sharing ORDER_NUMBER_NODE_ID)
+ORDER_NUMBER_ATTEMPTS = 3
+
+
+def _create_order(**fields):
+    """Insert an Order, drawing a new order number if the unique index rejects one"""
+    for attempt in range(ORDER_NUMBER_ATTEMPTS):
+        order_number = next_order_number()
+        try:
+            # Savepoint, so a clash doesn't abort the checkout transaction
+            with transaction.atomic():
+                return Order.objects.create(order_number=order_number, **fields)
+        except IntegrityError:
+            if attempt == ORDER_NUMBER_ATTEMPTS - 1 or not Order.objects.filter(order_number=order_number).exists():
+                raise
+
+
+def place_order(user, address, pin_code, payment_method, delivery_date, submission_key=None):
+    """Turn the user's cart into a confirmed order; returns the Order.
+
+    Raises InsufficientStock (and writes nothing) when any item can't be
+    covered, including when a concurrent checkout took the last units, and
+    EmptyCart when there is nothing left to buy. With a submission_key that
+    was already used, returns the order it produced instead.
+    """
+    # Backends with row locks lock the products first (SELECT ... FOR UPDATE). SQLite
+    # locks the whole database instead, and a read-then-write transaction there
+    # deadlocks against concurrent checkouts, so it takes the write lock with its
+    # first statement and reads the products after the guarded UPDATE.
+    lock_first = connection.features.has_select_for_update
+    cart_items = list(Cart.objects.filter(user=user).only('id', 'product_id', 'quantity'))
+    quantities = {}
+    for item in cart_items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    if not quantities:
+        # A concurrent submission with the same key may have just emptied the cart
+        order_id = submitted_order_id(user, submission_key)
+        if order_id is not None:
+            return Order.objects.get(pk=order_id)
+        raise EmptyCart()
+
+    try:
+        with transaction.atomic():
+            if submission_key:
+                submission = CheckoutSubmission.objects.create(key=submission_key, user=user)
+
+            if lock_first:
+                products = _products(user, list(quantities), lock=True)
+                insufficient = _insufficient(products, quantities)
+                if insufficient:
+                    raise InsufficientStock(insufficient)
+
+            # The WHERE clause re-checks stock (net of other buyers' holds), so no
+            # backend can oversell
+            quantity_field = Product._meta.get_field('quantity')
+            updated = Product.objects.filter(
+                id__in=list(quantities),
+                stock_status='in_stock',
+                quantity__gte=_per_product(quantities, Value(0), quantity_field) + held_quantity(user),
+            ).update(
+                quantity=F('quantity') - _per_product(quantities, Value(0), quantity_field),
+                total_sells=F('total_sells') + _per_product(quantities, Value(0), quantity_field),
+                stock_status=Case(
+                    *[When(id=product_id, quantity__lte=quantity, then=Value('out_of_stock'))
+                      for product_id, quantity in quantities.items()],
+                    default=F('stock_status'),
+                ),
+            )
+            if updated != len(quantities):
+                raise InsufficientStock([])
+
+            if not lock_first:
+                products = _products(user, list(quantities))
+
+            order = _create_order(
+                user=user,
+                address=address,
+                pin_code=pin_code,
+                payment_method=payment_method,
+                total_amount=sum(products[product_id].price * quantity for product_id, quantity in quantities.items()),
+                delivery_date=delivery_date,
+                status='confirmed',
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=product_id, quantity=quantity, price=products[product_id].price)
+                for product_id, quantity in quantities.items()
+            ])
+            sales.record_sales(
+                [(products[product_id].seller_id, product_id, quantity, products[product_id].price)
+                 for product_id, quantity in quantities.items()],
+                day=timezone.localdate(order.created_at),
+            )
+            Cart.objects.filter(id__in=[item.id for item in cart_items]).delete()
+            StockReservation.objects.filter(user=user).delete()
+            transaction.on_commit(lambda: invalidate_cart_summary(user.pk))
+            # The new order makes these products reviewable on their pages
+            transaction.on_commit(lambda: mark_purchased(user.pk, list(quantities)))
+            if submission_key:
+                CheckoutSubmission.objects.filter(pk=submission.pk).update(order=order)
+
+            # The bulk UPDATE skips post_save, so invalidate the listing pages by hand
+            listed = [product for product in products.values() if product.approval_status == 'approved']
+            if listed:
+                names = {HOME_VERSION} | {
+                    category_version(product.category_id) for product in listed if product.category_id
+                }
+                transaction.on_commit(lambda: bump_version(*names))
+    except IntegrityError:
+        # Another request with the same key got there first and has committed
+        order_id = submitted_order_id(user, submission_key)
+        if order_id is None:
+            raise
+        return Order.objects.get(pk=order_id)
+    except InsufficientStock as e:
+        if e.items:
+            raise
+        # Lost a race in the guarded UPDATE; everything was rolled back, so report current stock
+        raise InsufficientStock(_insufficient(_products(user, list(quantities)), quantities)) from None
+    return order
@@ -1,9 +1,28 @@
-from .models import Category
+from django.utils.functional import SimpleLazyObject
+
+from . import guest_cart
+from .caching import cached_categories, cart_summary
 
 
 def categories(request):
-    """Context processor to make categories available in all templates"""
+    """Context processor to make categories available in all templates.
+
+    Lazy, so responses that never render the header (JSON, redirects) skip it.
+    """
     return {
-        'categories': Category.objects.all()
+        'categories': SimpleLazyObject(cached_categories)
     }
 
+
+def cart_badge(request):
+    """Item count and total for the header cart badge (cached, see caching.cart_summary)"""
+    user = getattr(request, 'user', None)
+    if user is None:
+        return {}
+    if not user.is_authenticated:
+        return {
+            'cart_summary': SimpleLazyObject(lambda: guest_cart.summary(request))
+        }
+    return {
+        'cart_summary': SimpleLazyObject(lambda: cart_summary(user))
+    }
@@ -0,0 +1,158 @@
+"""
+Streaming CSV / JSON Lines exports of orders, order items and products.
+
+Rows are read with QuerySet.iterator(chunk_size=CHUNK_SIZE) (a server-side
+cursor on PostgreSQL) as flat values() tuples joined in SQL, and written to
+the response one line at a time, so memory stays flat however many rows
+are exported. Filters use indexed columns: created_at ranges plus order
+status or product approval status.
+
+Sellers' order exports carry seller_subtotal (their own items in the order)
+instead of the order's total_amount, which would include other sellers'
+items. CSV cells that a spreadsheet would read as a formula are prefixed
+with a quote.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .models import LINE_TOTAL_FIELD, Order, OrderItem, Product
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# dataset -> (columns as (header, values() lookup), status field, created_at field, ordering)
+DATASETS = {
+    'orders': ([
+        ('order_number', 'order_number'),
+        ('created_at', 'created_at'),
+        ('status', 'status'),
+        ('buyer', 'user__username'),
+        ('total_amount', 'total_amount'),
+        ('payment_method', 'payment_method'),
+        ('pin_code', 'pin_code'),
+        ('address', 'address'),
+        ('delivery_date', 'delivery_date'),
+    ], 'status', 'created_at', ('created_at', 'pk')),
+    'order-items': ([
+        ('order_number', 'order__order_number'),
+        ('order_created_at', 'order__created_at'),
+        ('order_status', 'order__status'),
+        ('product_id', 'product_id'),
+        ('product', 'product__name'),
+        ('seller', 'product__seller__username'),
+        ('quantity', 'quantity'),
+        ('price', 'price'),
+    ], 'order__status', 'order__created_at', ('order_id', 'pk')),
+    'products': ([
+        ('id', 'id'),
+        ('name', 'name'),
+        ('category', 'category__name'),
+        ('seller', 'seller__username'),
+        ('price', 'price'),
+        ('quantity', 'quantity'),
+        ('stock_status', 'stock_status'),
+        ('approval_status', 'approval_status'),
+        ('total_sells', 'total_sells'),
+        ('rating', 'rating'),
+        ('created_at', 'created_at'),
+    ], 'approval_status', 'created_at', ('created_at', 'pk')),
+}
+
+
+# Leading characters that make Excel/LibreOffice/Sheets evaluate a cell
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _is_staff(user):
+    return user.is_staff or user.is_superuser
+
+
+def parse_date(value, end=False):
+    """Aware datetime at the start of the given YYYY-MM-DD day (or of the next day when end=True)"""
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ExportError(f'Invalid date "{value}", expected YYYY-MM-DD.') from None
+    if end:
+        day += timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _base_queryset(dataset, user):
+    """Rows the user may export: staff get everything, sellers what involves their products"""
+    staff = _is_staff(user)
+    if dataset == 'orders':
+        orders = Order.objects.all()
+        if not staff:
+            own_items = OrderItem.objects.filter(order=OuterRef('pk'), product__seller=user)
+            subtotal = own_items.order_by().values('order').annotate(
+                total=Sum(F('quantity') * F('price'), output_field=LINE_TOTAL_FIELD)
+            ).values('total')
+            orders = orders.filter(Exists(own_items)).annotate(seller_subtotal=Subquery(subtotal, output_field=LINE_TOTAL_FIELD))
+        return orders
+    if dataset == 'order-items':
+        items = OrderItem.objects.all()
+        return items if staff else items.filter(product__seller=user)
+    # Drafts are half-finished uploads, not catalog entries
+    products = Product.objects.exclude(approval_status='draft')
+    return products if staff else products.filter(seller=user)
+
+
+def export_rows(dataset, user, since=None, until=None, status=None):
+    """(headers, iterator of value tuples) for a dataset and filters"""
+    if dataset not in DATASETS:
+        raise ExportError(f'Unknown export "{dataset}".')
+    columns, status_field, created_field, ordering = DATASETS[dataset]
+    if dataset == 'orders' and not _is_staff(user):
+        columns = [('seller_subtotal', 'seller_subtotal') if header == 'total_amount' else (header, lookup)
+                   for header, lookup in columns]
+    rows = _base_queryset(dataset, user)
+    if since:
+        rows = rows.filter(**{f'{created_field}__gte': parse_date(since)})
+    if until:
+        rows = rows.filter(**{f'{created_field}__lt': parse_date(until, end=True)})
+    if status:
+        rows = rows.filter(**{status_field: status})
+    rows = rows.order_by(*ordering).values_list(*[lookup for _, lookup in columns])
+    return [header for header, _ in columns], rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object whose write() just returns the line, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def stream_jsonl(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def stream(fmt, headers, rows):
+    return stream_csv(headers, rows) if fmt == 'csv' else stream_jsonl(headers, rows)
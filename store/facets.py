@@ -0,0 +1,152 @@
+"""
+Facet filters and counts for the search and category listings.
+
+All counts come from one conditional-aggregate query. Each facet is counted
+with every *other* selected filter applied, so choosing a price bucket still
+shows how many results the other buckets would give. Counts are cached for
+FACET_CACHE_SECONDS per normalized query and filter selection.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+FACET_CACHE_SECONDS = 60
+
+PRICE_BUCKETS = [
+    ('0-500', 'Under ₹500', None, 500),
+    ('500-1000', '₹500 - ₹1,000', 500, 1000),
+    ('1000-2500', '₹1,000 - ₹2,500', 1000, 2500),
+    ('2500-', '₹2,500 & above', 2500, None),
+]
+
+RATING_BUCKETS = [
+    ('4', '4★ & up', 4),
+    ('3', '3★ & up', 3),
+    ('2', '2★ & up', 2),
+    ('1', '1★ & up', 1),
+]
+
+STOCK_CHOICES = [
+    ('in_stock', 'In stock only'),
+    ('all', 'Include out of stock'),
+]
+
+FACET_PARAMS = ('price', 'rating', 'stock')
+
+
+def parse_filters(params):
+    """Selected facet values from request.GET, unknown values dropped"""
+    price = params.get('price')
+    rating = params.get('rating')
+    stock = params.get('stock')
+    return {
+        'price': price if price in {key for key, _, _, _ in PRICE_BUCKETS} else None,
+        'rating': rating if rating in {key for key, _, _ in RATING_BUCKETS} else None,
+        'stock': stock if stock == 'all' else 'in_stock',
+    }
+
+
+def _price_q(key):
+    for bucket_key, _, low, high in PRICE_BUCKETS:
+        if bucket_key == key:
+            q = Q()
+            if low is not None:
+                q &= Q(price__gte=low)
+            if high is not None:
+                q &= Q(price__lt=high)
+            return q
+    return Q()
+
+
+def _rating_q(key):
+    for bucket_key, _, minimum in RATING_BUCKETS:
+        if bucket_key == key:
+            return Q(rating__gte=minimum)
+    return Q()
+
+
+def filter_q(filters, skip=None):
+    """Q for the selected facet filters, leaving out the `skip` facet"""
+    q = Q()
+    if skip != 'price' and filters['price']:
+        q &= _price_q(filters['price'])
+    if skip != 'rating' and filters['rating']:
+        q &= _rating_q(filters['rating'])
+    if skip != 'stock' and filters['stock'] == 'in_stock':
+        q &= Q(stock_status='in_stock')
+    if skip != 'category' and filters.get('category') is not None:
+        q &= Q(category=filters['category'])
+    return q
+
+
+def apply_filters(products, filters):
+    return products.filter(filter_q(filters))
+
+
+def _count(q):
+    return Count('id', filter=q) if q else Count('id')
+
+
+def facet_counts(products, filters, categories=None):
+    """Counts for every facet value in a single aggregate query"""
+    aggregates = {'total': _count(filter_q(filters))}
+    for key, _, _, _ in PRICE_BUCKETS:
+        aggregates[f'price_{key}'] = _count(filter_q(filters, skip='price') & _price_q(key))
+    for key, _, _ in RATING_BUCKETS:
+        aggregates[f'rating_{key}'] = _count(filter_q(filters, skip='rating') & _rating_q(key))
+    aggregates['stock_in_stock'] = _count(filter_q(filters, skip='stock') & Q(stock_status='in_stock'))
+    aggregates['stock_all'] = _count(filter_q(filters, skip='stock'))
+    for category in categories or []:
+        aggregates[f'category_{category.pk}'] = _count(filter_q(filters, skip='category') & Q(category=category))
+    return products.aggregate(**aggregates)
+
+
+def cached_facet_counts(cache_parts, products, filters, categories=None):
+    """facet_counts() cached briefly under the normalized query + filters"""
+    selected = filters.get('category')
+    key_source = '|'.join(str(part).casefold().strip() for part in cache_parts) + '|' + '|'.join(
+        f'{name}={filters[name]}' for name in FACET_PARAMS
+    ) + f'|category={selected.pk if selected is not None else ""}'
+    cache_key = 'facets:' + hashlib.md5(key_source.encode()).hexdigest()
+    counts = cache.get(cache_key)
+    if counts is None:
+        counts = facet_counts(products, filters, categories)
+        cache.set(cache_key, counts, FACET_CACHE_SECONDS)
+    return counts
+
+
+def build_facets(params, filters, counts, categories=None):
+    """Facet groups for the template: each option has label, count, selected and query"""
+    def option(name, value, label, count, selected):
+        query = params.copy()
+        query.pop('page', None)
+        if name == 'category' and selected:
+            # Keep the (empty) category param so search still means "all categories"
+            query[name] = ''
+        elif selected or value is None:
+            query.pop(name, None)
+        else:
+            query[name] = value
+        return {'label': label, 'count': count, 'selected': selected, 'query': query.urlencode()}
+
+    groups = []
+    if categories:
+        groups.append({'title': 'Category', 'options': [
+            option('category', category.slug, category.name, counts[f'category_{category.pk}'],
+                   filters.get('category') == category)
+            for category in categories if counts[f'category_{category.pk}']
+        ]})
+    groups.append({'title': 'Price', 'options': [
+        option('price', key, label, counts[f'price_{key}'], filters['price'] == key)
+        for key, label, _, _ in PRICE_BUCKETS
+    ]})
+    groups.append({'title': 'Customer Rating', 'options': [
+        option('rating', key, label, counts[f'rating_{key}'], filters['rating'] == key)
+        for key, label, _ in RATING_BUCKETS
+    ]})
+    groups.append({'title': 'Availability', 'options': [
+        option('stock', None, STOCK_CHOICES[0][1], counts['stock_in_stock'], filters['stock'] == 'in_stock'),
+        option('stock', 'all', STOCK_CHOICES[1][1], counts['stock_all'], filters['stock'] == 'all'),
+    ]})
+    return groups
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from .models import User, Product, ProductImage, ProductVideo, Category, Review
+from .uploads import SNIFF_BYTES, sniff
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -60,6 +61,16 @@ class ProductForm(forms.ModelForm):
         self.fields['category'].queryset = Category.objects.all()
         self.fields['category'].empty_label = "No Category (Optional)"
 
+    def clean_video(self):
+        """Accept only files whose first bytes are a supported video format"""
+        video = self.cleaned_data.get('video')
+        if video:
+            head = video.read(SNIFF_BYTES)
+            video.seek(0)
+            if sniff(head)[0] != 'video':
+                raise forms.ValidationError('Upload an MP4, QuickTime or WebM video.')
+        return video
+
 
 class UserSettingsForm(forms.ModelForm):
     """Form for user settings"""
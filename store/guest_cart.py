@@ -0,0 +1,103 @@
+"""
+Cart for visitors who aren't logged in.
+
+Kept client-side in a signed cookie ("<product id>:<quantity>" pairs joined
+by commas), so browsing and adding to the cart never write to the database.
+On login or signup the cookie is merged into the user's Cart rows with one
+bulk upsert and then cleared.
+"""
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Cart, Product, primary_image_prefetch
+
+COOKIE_NAME = 'guest_cart'
+COOKIE_SALT = 'store.guest_cart'
+COOKIE_MAX_AGE = 30 * 24 * 60 * 60
+
+# Keeps the cookie well under the 4KB browser limit
+MAX_ITEMS = 50
+MAX_QUANTITY = 99
+
+
+def load(request):
+    """{product_id: quantity} from the request's cookie; empty if missing or tampered with"""
+    value = request.get_signed_cookie(COOKIE_NAME, default='', salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE)
+    items = {}
+    for pair in value.split(','):
+        product_id, _, quantity = pair.partition(':')
+        if product_id.isdigit() and quantity.isdigit() and int(quantity) > 0:
+            items[int(product_id)] = min(int(quantity), MAX_QUANTITY)
+    return items
+
+
+def summary(request):
+    """Header badge data like caching.cart_summary, from the cookie alone (no total)"""
+    return {'item_count': sum(load(request).values())}
+
+
+def save(response, items):
+    """Write items back to the cookie (deleting it when the cart is empty)"""
+    if not items:
+        clear(response)
+        return
+    value = ','.join(f'{product_id}:{quantity}' for product_id, quantity in list(items.items())[-MAX_ITEMS:])
+    response.set_signed_cookie(
+        COOKIE_NAME, value, salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE, httponly=True, samesite='Lax'
+    )
+
+
+def clear(response):
+    response.delete_cookie(COOKIE_NAME, samesite='Lax')
+
+
+class GuestCartItem:
+    """Quacks like a Cart row for cart.html; `id` is the product id"""
+
+    def __init__(self, product, quantity):
+        self.id = product.id
+        self.product = product
+        self.quantity = quantity
+        self.line_total = product.price * quantity
+
+
+def items_for_display(items):
+    """GuestCartItems for approved products still in the cookie, newest first"""
+    products = Product.objects.filter(id__in=list(items), approval_status='approved').select_related(
+        'category', 'seller'
+    ).prefetch_related(primary_image_prefetch()).in_bulk()
+    return [
+        GuestCartItem(products[product_id], quantity)
+        for product_id, quantity in reversed(items.items())
+        if product_id in products
+    ]
+
+
+def merge_into_cart(request, user):
+    """Add the cookie's items to the user's cart in one upsert; returns the number of products merged.
+
+    Quantities are added to what is already in the cart. Unapproved products
+    and the user's own products are dropped.
+    """
+    items = load(request)
+    if not items:
+        return 0
+    existing = Cart.objects.filter(user=user, product=OuterRef('pk')).values('quantity')[:1]
+    products = (
+        Product.objects.filter(id__in=list(items), approval_status='approved')
+        .exclude(seller=user)
+        .annotate(in_cart=Coalesce(Subquery(existing), Value(0)))
+        .values_list('id', 'in_cart')
+    )
+    rows = [
+        Cart(user=user, product_id=product_id, quantity=in_cart + items[product_id])
+        for product_id, in_cart in products
+    ]
+    if rows:
+        Cart.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user', 'product'],
+            update_fields=['quantity', 'updated_at'],
+        )
+    return len(rows)
@@ -0,0 +1,93 @@
+"""
+Image decoding and resizing shared by bulk tools and the variant pool.
+
+Functions here take and return plain paths/bytes so they can run in worker
+processes (concurrent.futures.ProcessPoolExecutor) without touching the
+database or Django storage.
+"""
+import io
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Longest side of stored product images
+MAX_IMAGE_SIZE = 1600
+JPEG_QUALITY = 85
+# Widths of the responsive derivatives (cards are ~300px wide, 600 covers 2x screens)
+VARIANT_WIDTHS = (150, 300, 600)
+WEBP_QUALITY = 80
+
+
+class ImageError(ValueError):
+    pass
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def prepare_image(path, max_size=MAX_IMAGE_SIZE):
+    """Verify, downscale and re-encode an image file; returns (bytes, extension).
+
+    Images with transparency are kept as PNG, everything else becomes
+    progressive JPEG. Raises ImageError for missing, truncated or non-image
+    files.
+    """
+    try:
+        with Image.open(path) as image:
+            image.verify()
+        # verify() leaves the image unusable, so decode it again
+        with Image.open(path) as image:
+            # JPEG sources decode straight at (roughly) the target size
+            image.draft('RGB', (max_size, max_size))
+            image.thumbnail((max_size, max_size))
+            buffer = io.BytesIO()
+            if _has_alpha(image):
+                image.save(buffer, 'PNG')
+                extension = 'png'
+            else:
+                image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+                extension = 'jpg'
+    except FileNotFoundError:
+        raise ImageError(f'{path}: file not found') from None
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ImageError(f'{path}: {e}') from None
+    return buffer.getvalue(), extension
+
+
+def make_variants(path, widths=VARIANT_WIDTHS):
+    """Downscaled copies of an image file (path or file object) for srcset.
+
+    Returns [(width, extension, bytes), ...]. Each width is produced twice: as WebP and as a JPEG (PNG with transparency) fallback.
+    Widths beyond the source are capped at the source width rather than
+    upscaled. Raises ImageError for unreadable files.
+    """
+    try:
+        with Image.open(path) as image:
+            image.draft('RGB', (max(widths), max(widths)))
+            # Phone photos are stored sideways with an EXIF rotation flag
+            image = ImageOps.exif_transpose(image)
+            alpha = _has_alpha(image)
+            image = image.convert('RGBA' if alpha else 'RGB')
+    except FileNotFoundError:
+        raise ImageError(f'{path}: file not found') from None
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ImageError(f'{path}: {e}') from None
+
+    source_width, source_height = image.size
+    results = []
+    for width in sorted({min(width, source_width) for width in widths}):
+        height = max(1, round(source_height * width / source_width))
+        resized = image if width == source_width else image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+
+        buffer = io.BytesIO()
+        resized.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+        results.append((width, 'webp', buffer.getvalue()))
+
+        buffer = io.BytesIO()
+        if alpha:
+            resized.save(buffer, 'PNG')
+            results.append((width, 'png', buffer.getvalue()))
+        else:
+            resized.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            results.append((width, 'jpg', buffer.getvalue()))
+    return results
@@ -0,0 +1,58 @@
+"""
+Querysets behind the catalog pages.
+
+The views build their listings here and audit_query_plans EXPLAINs the same
+helpers, so the plans it checks are the queries the pages actually run.
+Facet filters (facets.apply_filters) and the listing prefetch (for_listing)
+are applied by the caller, after the facet counts are taken.
+"""
+from . import facets, search
+from .models import Product
+
+HOME_PER_PAGE = 8
+SEARCH_PER_PAGE = 8
+CATEGORY_PER_PAGE = 12
+PENDING_PER_PAGE = 50
+
+
+def home_products(featured=True):
+    """Approved, in-stock products for the home page; featured ones only unless featured=False"""
+    products = Product.objects.for_listing().filter(stock_status='in_stock', approval_status='approved')
+    if featured:
+        products = products.filter(is_featured=True)
+    return products.order_by('-created_at')
+
+
+def category_products(category):
+    return Product.objects.filter(category=category, approval_status='approved')
+
+
+def search_products(query, browsing=False):
+    """(products, ranked ids or None) for a search; with no query only `browsing` lists anything.
+
+    With a full-text index the products are limited to the ranked ids, which
+    the caller pages through in rank order.
+    """
+    products = Product.objects.filter(approval_status='approved')
+    ranked_ids = search.ranked_product_ids(query) if query else None
+    if ranked_ids is not None:
+        products = products.filter(id__in=ranked_ids)
+    elif query:
+        products = search.fallback_filter(products, query)
+    elif not browsing:
+        products = products.none()
+    return products, ranked_ids
+
+
+def filtered(products, filters):
+    """Listing queryset for the selected facet filters"""
+    return facets.apply_filters(products, filters).for_listing()
+
+
+def seller_products(seller):
+    # Drafts only exist while an add-product page is uploading; the form turns them into products
+    return Product.objects.for_listing().filter(seller=seller).exclude(approval_status='draft')
+
+
+def pending_products():
+    return Product.objects.for_listing().filter(approval_status='pending')
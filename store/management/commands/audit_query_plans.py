@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from store import facets, listings
+from store.models import Category, Product, User
+from store.pagination import CursorPaginator
+
+
+class Command(BaseCommand):
+    """EXPLAIN the catalog view querysets and fail on full table scans"""
+    help = 'Run EXPLAIN on the catalog view querysets and fail if any of them scans the whole product table'
+
+    def first_page(self, products, per_page):
+        return CursorPaginator(products, per_page).page_queryset()
+
+    def get_querysets(self):
+        """The first-page queries of the catalog views, built with the same listings helpers"""
+        category = Category.objects.first() or Category(pk=0)
+        seller = User.objects.filter(role='seller').first() or User(pk=0)
+        querysets = [
+            ('home (featured)', self.first_page(listings.home_products(), listings.HOME_PER_PAGE)),
+            ('home (recent)', self.first_page(listings.home_products(featured=False), listings.HOME_PER_PAGE)),
+        ]
+        for stock in ('in_stock', 'all'):
+            filters = facets.parse_filters({'stock': stock})
+            querysets.append((f'category_products (stock={stock})', self.first_page(
+                listings.filtered(listings.category_products(category), filters), listings.CATEGORY_PER_PAGE
+            )))
+            products, _ = listings.search_products('', browsing=True)
+            querysets.append((f'search_products (category, stock={stock})', self.first_page(
+                listings.filtered(products, dict(filters, category=category)), listings.SEARCH_PER_PAGE
+            )))
+
+        # A word from a real product name, so the full-text search returns ids to filter on
+        name = Product.objects.filter(approval_status='approved').values_list('name', flat=True).first() or ''
+        products, ranked_ids = listings.search_products(name.split(' ')[0])
+        if ranked_ids:
+            querysets.append(('search_products (full-text ids)', listings.filtered(
+                products, facets.parse_filters({'stock': 'all'})
+            ).values_list('id', flat=True)))
+        else:
+            self.stdout.write(self.style.WARNING('search_products (full-text ids): skipped, no full-text matches'))
+
+        querysets += [
+            ('admin_page', listings.seller_products(seller)),
+            ('pending_products', self.first_page(listings.pending_products(), listings.PENDING_PER_PAGE)),
+        ]
+        return querysets
+
+    def is_full_scan(self, plan):
+        table = Product._meta.db_table
+        if connection.vendor == 'postgresql':
+            return f'Seq Scan on {table}' in plan
+        for line in plan.splitlines():
+            # SQLite reports "SCAN <table>" (or "SCAN TABLE <table>") for a full table scan,
+            # and "SEARCH ... USING INDEX" / "SCAN ... USING INDEX" when an index drives it
+            words = line.replace('TABLE ', '').split()
+            if 'SCAN' in words and table in words and 'USING' not in words:
+                return True
+        return False
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, queryset in self.get_querysets():
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(plan)
+            if self.is_full_scan(plan):
+                failures.append(label)
+                self.stdout.write(self.style.ERROR('  -> full table scan'))
+            else:
+                self.stdout.write(self.style.SUCCESS('  -> indexed'))
+
+        if failures:
+            raise CommandError('Full table scan in: ' + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All catalog querysets use an index.'))
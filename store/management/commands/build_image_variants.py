@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from store import variants
+from store.images import ImageError, make_variants
+from store.models import ProductImage
+
+
+def _make(path):
+    """Worker: path -> make_variants() results or an error string"""
+    try:
+        return make_variants(path)
+    except ImageError as e:
+        return str(e)
+
+
+class Command(BaseCommand):
+    """Generate the responsive WebP/JPEG copies for product images that don't have them yet"""
+    help = 'Build srcset variants for existing product images (--all to rebuild every image)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild images that already have variants')
+        parser.add_argument('--batch-size', type=int, default=200, help='Images resized per batch')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Image processing processes')
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.order_by('id').only('id', 'image')
+        if not options['all']:
+            images = images.filter(variants={})
+        workers = max(1, options['workers'])
+
+        started = time.monotonic()
+        built = failed = 0
+        last_id = 0
+        # Keyset batches: rows finished by an earlier batch drop out of the filter anyway
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                batch = list(images.filter(id__gt=last_id)[:options['batch_size']])
+                if not batch:
+                    break
+                last_id = batch[-1].pk
+                paths = [image.image.path for image in batch]
+                for image, result in zip(batch, pool.map(_make, paths, chunksize=max(1, len(paths) // (workers * 4)))):
+                    if isinstance(result, str):
+                        failed += 1
+                        self.stderr.write(f'Image {image.pk}: {result}')
+                        continue
+                    variants.store_variants(image.pk, image.image.name, result)
+                    built += 1
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f'Up to image {last_id}: {built} built, {failed} failed')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Built variants for {built} images in {elapsed:.1f}s; {failed} could not be read.'
+        ))
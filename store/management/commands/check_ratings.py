@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from store.models import RATING_STARS, Product, Review, rating_from_counters
+
+
+class Command(BaseCommand):
+    """Compare the stored rating counters with the reviews and optionally repair them"""
+    help = (
+        'Report products whose rating_sum/rating_count/rating or per-star counts disagree with their reviews '
+        '(--fix to repair)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite the counters of drifted products')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products repaired per UPDATE batch')
+
+    def handle(self, *args, **options):
+        totals = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        star_fields = [f'rating_{stars}_count' for stars in RATING_STARS]
+        star_counts = {
+            f'actual_{field}': Coalesce(
+                Subquery(totals.filter(rating=stars).annotate(total=Count('id')).values('total')), Value(0)
+            )
+            for stars, field in zip(RATING_STARS, star_fields)
+        }
+        drift = ~Q(rating_sum=F('actual_sum')) | ~Q(rating_count=F('actual_count')) | ~Q(rating=F('actual_rating'))
+        for field in star_fields:
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        products = Product.objects.annotate(
+            actual_sum=Coalesce(Subquery(totals.annotate(total=Sum('rating')).values('total')), Value(0)),
+            actual_count=Coalesce(Subquery(totals.annotate(total=Count('id')).values('total')), Value(0)),
+            **star_counts,
+        ).annotate(
+            actual_rating=rating_from_counters(F('actual_sum'), F('actual_count')),
+        ).filter(drift).only('id', 'name', 'rating', 'rating_sum', 'rating_count', *star_fields)
+
+        drifted = 0
+        batch = []
+        for product in products.iterator(chunk_size=options['batch_size']):
+            drifted += 1
+            self.stdout.write(
+                f'{product.pk} {product.name}: stored {product.rating_sum}/{product.rating_count} ({product.rating}), '
+                f'reviews {product.actual_sum}/{product.actual_count} ({product.actual_rating}); stars stored '
+                f'{[getattr(product, field) for field in star_fields]}, '
+                f'reviews {[getattr(product, f"actual_{field}") for field in star_fields]}'
+            )
+            if options['fix']:
+                product.rating_sum = product.actual_sum
+                product.rating_count = product.actual_count
+                product.rating = product.actual_rating
+                for field in star_fields:
+                    setattr(product, field, getattr(product, f'actual_{field}'))
+                batch.append(product)
+                if len(batch) >= options['batch_size']:
+                    self._repair(batch, star_fields)
+                    batch = []
+        if batch:
+            self._repair(batch, star_fields)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All product rating counters match their reviews.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {drifted} products.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{drifted} products have drifted; run with --fix to repair.'))
+
+    def _repair(self, products, star_fields):
+        with transaction.atomic():
+            Product.objects.bulk_update(products, ['rating_sum', 'rating_count', 'rating', *star_fields])
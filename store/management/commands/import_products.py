@@ -0,0 +1,217 @@
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.text import slugify
+
+from store import variants
+from store.forms import ProductForm
+from store.images import MAX_IMAGE_SIZE, ImageError, make_variants, prepare_image
+from store.models import Category, ImportCheckpoint, Product, ProductImage, User
+
+IMAGE_UPLOAD_TO = ProductImage._meta.get_field('image').upload_to
+
+
+def read_rows(path):
+    """Yield row dicts from a .csv or .jsonl file"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.suffix.lower() == '.csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _image_names(value):
+    if isinstance(value, list):
+        return [name for name in value if name]
+    return [name.strip() for name in (value or '').replace('|', ';').split(';') if name.strip()]
+
+
+def _prepare(job):
+    """Worker: (path, max_size) -> (bytes, extension, variants) or an error string"""
+    path, max_size = job
+    try:
+        data, extension = prepare_image(path, max_size)
+        # srcset copies too: bulk_create skips the signal that would schedule them
+        return data, extension, make_variants(io.BytesIO(data))
+    except ImageError as e:
+        return str(e)
+
+
+class Command(BaseCommand):
+    """Bulk-create products (and their images) from a CSV or JSON Lines file"""
+    help = (
+        'Import products for a seller from CSV/JSONL. Columns: name, description, price, quantity, '
+        'stock_status, category (slug or name), is_featured, images (file names separated by ";"). '
+        'Products are created pending approval, as through add_product.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Path to a .csv or .jsonl file')
+        parser.add_argument('--seller', required=True, help='Username of the seller the products belong to')
+        parser.add_argument('--images', default='.', help='Directory the image file names are relative to')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows validated and inserted per batch')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Image processing processes')
+        parser.add_argument('--max-image-size', type=int, default=MAX_IMAGE_SIZE, help='Longest image side in pixels')
+        parser.add_argument('--checkpoint', help='Checkpoint name (default: the source path)')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        source = Path(options['source']).resolve()
+        if not source.exists() or source.suffix.lower() not in ('.csv', '.jsonl'):
+            raise CommandError(f'{source}: expected an existing .csv or .jsonl file.')
+        try:
+            self.seller = User.objects.get(username=options['seller'], role='seller')
+        except User.DoesNotExist:
+            raise CommandError(f'No seller named "{options["seller"]}".')
+        self.image_dir = Path(options['images']).resolve()
+        self.max_image_size = options['max_image_size']
+        self.workers = max(1, options['workers'])
+        self.verbose = options['verbosity'] >= 1
+        self.categories = {}
+        for pk, slug, name in Category.objects.values_list('pk', 'slug', 'name'):
+            self.categories[slug.casefold()] = pk
+            self.categories[name.casefold()] = pk
+
+        # The checkpoint row is saved in each batch's transaction, so a crash
+        # can never leave a committed batch that resuming would import again.
+        name = (options['checkpoint'] or str(source))[:255]
+        if options['restart']:
+            ImportCheckpoint.objects.filter(name=name).delete()
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(name=name, defaults={'source': str(source)})
+        if checkpoint.source != str(source):
+            raise CommandError(f'Checkpoint "{name}" belongs to {checkpoint.source}; use --restart or --checkpoint.')
+        if checkpoint.rows_done:
+            self.stdout.write(f'Resuming after row {checkpoint.rows_done}.')
+        skip = checkpoint.rows_done
+
+        started = time.monotonic()
+        created_before, images_before = checkpoint.created, checkpoint.images
+        batch = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for number, row in enumerate(read_rows(source), start=1):
+                if number <= skip:
+                    continue
+                batch.append((number, row))
+                if len(batch) >= options['batch_size']:
+                    self.import_batch(batch, pool, checkpoint)
+                    self.report(checkpoint, started, created_before, images_before)
+                    batch = []
+            if batch:
+                self.import_batch(batch, pool, checkpoint)
+
+        elapsed = time.monotonic() - started
+        created = checkpoint.created - created_before
+        images = checkpoint.images - images_before
+        per_minute = created * 60 / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} products with {images} images in {elapsed:.1f}s '
+            f'({per_minute:.0f} products/min); {checkpoint.failed} rows rejected in total.'
+        ))
+
+    def validate(self, number, row):
+        """Product instance and image paths for a row, or None after reporting why it was rejected"""
+        form = ProductForm(data={
+            'name': row.get('name', ''),
+            'description': row.get('description', ''),
+            'price': row.get('price', ''),
+            'quantity': row.get('quantity', ''),
+            'stock_status': row.get('stock_status') or 'in_stock',
+            'is_featured': str(row.get('is_featured', '')).strip().lower() in ('1', 'true', 'yes', 'on'),
+        })
+        # Categories are resolved from the preloaded map instead of a query per row
+        del form.fields['category']
+        errors = []
+        if not form.is_valid():
+            errors.extend(f'{field}: {" ".join(messages)}' for field, messages in form.errors.items())
+
+        category_id = None
+        category = str(row.get('category') or '').strip()
+        if category:
+            category_id = self.categories.get(category.casefold()) or self.categories.get(slugify(category))
+            if category_id is None:
+                errors.append(f'category: unknown category "{category}"')
+
+        image_names = _image_names(row.get('images'))
+        if not image_names:
+            errors.append('images: at least one product image is required')
+
+        if errors:
+            self.stderr.write(f'Row {number}: ' + '; '.join(errors))
+            return None
+        product = form.save(commit=False)
+        product.category_id = category_id
+        product.seller = self.seller
+        product.approval_status = 'pending'
+        return product, [self.image_dir / name for name in image_names]
+
+    def import_batch(self, batch, pool, checkpoint):
+        rows = []
+        for number, row in batch:
+            validated = self.validate(number, row)
+            if validated:
+                rows.append((number, *validated))
+
+        # Decode/verify/resize every image of the batch in the pool
+        jobs = [(str(path), self.max_image_size) for _, _, paths in rows for path in paths]
+        results = iter(pool.map(_prepare, jobs, chunksize=max(1, len(jobs) // (self.workers * 4))))
+
+        products = []
+        images = []
+        saved_files = []
+        try:
+            for number, product, paths in rows:
+                prepared = [next(results) for _ in paths]
+                errors = [result for result in prepared if isinstance(result, str)]
+                if errors:
+                    self.stderr.write(f'Row {number}: ' + '; '.join(errors))
+                    continue
+                saved = []
+                for path, (data, extension, copies) in zip(paths, prepared):
+                    name = default_storage.save(f'{IMAGE_UPLOAD_TO}{path.stem}.{extension}', ContentFile(data))
+                    saved_files.append(name)
+                    saved.append((name, variants.save_variants(name, copies)))
+                products.append(product)
+                images.append(saved)
+
+            with transaction.atomic():
+                Product.objects.bulk_create(products)
+                ProductImage.objects.bulk_create([
+                    ProductImage(product=product, image=name, is_primary=(i == 0), variants=image_variants)
+                    for product, saved in zip(products, images)
+                    for i, (name, image_variants) in enumerate(saved)
+                ])
+                checkpoint.rows_done = batch[-1][0]
+                checkpoint.created += len(products)
+                checkpoint.images += sum(len(names) for names in images)
+                checkpoint.failed += len(batch) - len(products)
+                checkpoint.save()
+        except BaseException:
+            # Nothing was committed for this batch, so nothing refers to its files
+            for name in saved_files:
+                default_storage.delete(name)
+            variants.delete_unreferenced(
+                name for saved in images for _, image_variants in saved for name in variants.variant_names(image_variants)
+            )
+            checkpoint.refresh_from_db()
+            raise
+
+    def report(self, checkpoint, started, created_before, images_before):
+        if not self.verbose:
+            return
+        elapsed = time.monotonic() - started
+        created = checkpoint.created - created_before
+        self.stdout.write(
+            f'Row {checkpoint.rows_done}: {created} products, {checkpoint.images - images_before} images, '
+            f'{checkpoint.failed} rejected, {created * 60 / elapsed if elapsed else 0:.0f} products/min'
+        )
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import search
+
+
+class Command(BaseCommand):
+    """Rebuild the product full-text index from scratch"""
+    help = 'Rebuild the product full-text search index from all approved products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products inserted per batch')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('The configured database backend has no full-text index (SQLite or PostgreSQL required).')
+        started = time.monotonic()
+        total = search.rebuild_index(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} products in {elapsed:.2f}s.'))
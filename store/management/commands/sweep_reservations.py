@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from store.reservations import sweep_expired
+
+
+class Command(BaseCommand):
+    """Delete expired stock reservations"""
+    help = 'Delete expired checkout stock reservations in batches (run from cron every few minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Reservations deleted per DELETE')
+
+    def handle(self, *args, **options):
+        removed = sweep_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired reservations.'))
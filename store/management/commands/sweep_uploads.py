@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from store.uploads import sweep_drafts, sweep_stale
+
+
+class Command(BaseCommand):
+    """Delete abandoned chunked uploads and their partial files, then the draft products left behind"""
+    help = 'Delete unfinished chunked uploads and draft products that have not received a chunk recently (run from cron daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Age of the last chunk before an upload is abandoned')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Uploads or drafts deleted per DELETE')
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(hours=options['hours'])
+        removed = sweep_stale(older_than, batch_size=options['batch_size'])
+        drafts = sweep_drafts(older_than, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} abandoned uploads and {drafts} abandoned drafts.'))
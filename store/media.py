@@ -0,0 +1,162 @@
+"""
+Serving files under MEDIA_ROOT with byte ranges and conditional GETs.
+
+Video players seek with Range requests and browsers revalidate images with
+If-None-Match / If-Modified-Since, so every response carries an ETag (size
+and mtime), Last-Modified and Accept-Ranges. Whole files go out as a
+FileResponse over the real file object, which lets the WSGI server's
+wsgi.file_wrapper use sendfile(); a range is read from an offset in
+FileResponse-sized blocks. Derivatives whose names carry a content hash
+(see variants.py) never change in place and are marked immutable for a
+year; everything else is cached briefly and revalidated.
+
+Only image and video types the upload paths accept are served inline. Any
+other file under MEDIA_ROOT goes out as an application/octet-stream
+attachment, so an uploaded .html or .svg can never run as a page on the
+shop's origin.
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .uploads import EXTENSIONS
+from .variants import HASHED_NAME
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'public, max-age=3600'
+INLINE_TYPES = frozenset(EXTENSIONS)
+
+SINGLE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single "bytes=" range, or None to send the whole file.
+
+    Multiple ranges and malformed headers are ignored (a full 200 is always a
+    valid answer); ranges that start past the end raise RangeNotSatisfiable.
+    """
+    match = SINGLE_RANGE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    """A Range only applies while the validator in If-Range still describes the file"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+class _RangeFile:
+    """Read-only view of bytes [start, end] of an open file, for FileResponse"""
+
+    def __init__(self, file, start, end):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = end - start + 1
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def serve(request, path):
+    """Response for GET/HEAD of MEDIA_ROOT/<path>; raises Http404 for anything that isn't a file there"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat_result = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404('No such media file.')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('No such media file.')
+
+    size = stat_result.st_size
+    mtime = stat_result.st_mtime
+    etag = f'"{size:x}-{stat_result.st_mtime_ns:x}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': IMMUTABLE_CACHE if HASHED_NAME.search(path) else REVALIDATE_CACHE,
+        'X-Content-Type-Options': 'nosniff',
+    }
+
+    # 304 for a matching If-None-Match / If-Modified-Since, 412 for a failed If-Match
+    response = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+    if response is not None:
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    byte_range = None
+    if request.headers.get('Range') and _if_range_matches(request, etag, mtime):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            for name, value in headers.items():
+                response[name] = value
+            return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    inline = content_type in INLINE_TYPES and not encoding
+    if not inline:
+        content_type = 'application/octet-stream'
+        headers['Content-Disposition'] = 'attachment'
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type, status=206 if byte_range else 200)
+    elif byte_range:
+        response = FileResponse(_RangeFile(open(full_path, 'rb'), *byte_range), content_type=content_type, status=206)
+    else:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+    if byte_range:
+        start, end = byte_range
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response['Content-Length'] = str(size)
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_product_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_featured_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_live_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_category_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['approval_status', 'stock_status', 'is_featured', '-created_at', '-id'], name='product_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['approval_status', 'stock_status', '-created_at', '-id'], name='product_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'approval_status', 'stock_status', '-created_at', '-id'], name='product_category_idx'),
+        ),
+    ]
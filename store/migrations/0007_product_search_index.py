@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 table on SQLite, tsvector + GIN table on PostgreSQL; filled from approved products"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE store_product_fts USING fts5("
+            "name, category, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO store_product_fts (rowid, name, category, description) "
+            "SELECT p.id, p.name, COALESCE(c.name, ''), p.description "
+            "FROM store_product p LEFT JOIN store_category c ON c.id = p.category_id "
+            "WHERE p.approval_status = 'approved'"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE store_product_fts ("
+            "product_id bigint PRIMARY KEY REFERENCES store_product(id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute("CREATE INDEX store_product_fts_document ON store_product_fts USING GIN (document)")
+        schema_editor.execute(
+            "INSERT INTO store_product_fts (product_id, document) "
+            "SELECT p.id, setweight(to_tsvector('english', p.name), 'A') || "
+            "setweight(to_tsvector('english', COALESCE(c.name, '')), 'B') || "
+            "setweight(to_tsvector('english', p.description), 'C') "
+            "FROM store_product p LEFT JOIN store_category c ON c.id = p.category_id "
+            "WHERE p.approval_status = 'approved'"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS store_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_product_listing_index_tiebreak'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
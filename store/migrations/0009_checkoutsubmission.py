@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_stockreservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckoutSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.order')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkout_submissions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_checkoutsubmission'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='order_user_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_order_export_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_approval_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['approval_status', '-created_at', '-id'], name='product_approval_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:36
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_counters(apps, schema_editor):
+    """Start the counters from the reviews that already exist (one UPDATE)"""
+    Product = apps.get_model('store', 'Product')
+    Review = apps.get_model('store', 'Review')
+    totals = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    Product.objects.update(
+        rating_sum=Coalesce(Subquery(totals.annotate(total=Sum('rating')).values('total')), Value(0)),
+        rating_count=Coalesce(Subquery(totals.annotate(total=Count('id')).values('total')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_product_approval_index_tiebreak'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_counters, migrations.RunPython.noop),
+    ]
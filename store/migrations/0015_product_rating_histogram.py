@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_histogram(apps, schema_editor):
+    """Start the per-star counts from the reviews that already exist (one UPDATE)"""
+    Product = apps.get_model('store', 'Product')
+    Review = apps.get_model('store', 'Review')
+    counts = {}
+    for stars in range(1, 6):
+        matching = Review.objects.filter(product=OuterRef('pk'), rating=stars).order_by().values('product')
+        counts[f'rating_{stars}_count'] = Coalesce(
+            Subquery(matching.annotate(total=Count('id')).values('total')), Value(0)
+        )
+    Product.objects.update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_product_rating_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_histogram, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='review_product_idx'),
+        ),
+    ]
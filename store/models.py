@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg
+from django.db.models import Case, ExpressionWrapper, F, OuterRef, Prefetch, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Cast, Coalesce, Round, RowNumber
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
 from decimal import Decimal
+import uuid
 
 
 class User(AbstractUser):
@@ -34,6 +38,43 @@ class Category(models.Model):
         return self.name
 
 
+def primary_image_prefetch(lookup='images'):
+    """Prefetch only the card image (primary, else oldest) of each product"""
+    ranked = ProductImage.objects.annotate(
+        listing_rank=Window(
+            RowNumber(),
+            partition_by=[F('product_id')],
+            order_by=[F('is_primary').desc(), F('id').asc()],
+        )
+    ).filter(listing_rank=1)
+    return Prefetch(lookup, queryset=ranked, to_attr='listing_images')
+
+
+class ProductQuerySet(models.QuerySet):
+    """Shared product querysets"""
+
+    def for_listing(self):
+        """Products ready for card/table rendering in a constant number of queries"""
+        return self.select_related('category', 'seller').prefetch_related(primary_image_prefetch())
+
+    def with_available(self, exclude_user=None):
+        """Annotate `available_quantity`: quantity minus other buyers' active reservations"""
+        return self.annotate(available_quantity=F('quantity') - held_quantity(exclude_user))
+
+
+def held_quantity(exclude_user=None):
+    """Units of the outer product held by active reservations, optionally not counting one user's"""
+    holds = StockReservation.objects.filter(product=OuterRef('pk'), expires_at__gt=timezone.now())
+    if exclude_user is not None:
+        holds = holds.exclude(user=exclude_user)
+    total = holds.order_by().values('product').annotate(total=Sum('quantity')).values('total')
+    return Coalesce(Subquery(total), 0, output_field=models.IntegerField())
+
+
+# Star values a review can have (Review.rating)
+RATING_STARS = range(1, 6)
+
+
 class Product(models.Model):
     """Product model"""
     STOCK_STATUS = [
@@ -42,6 +83,8 @@ class Product(models.Model):
     ]
     
     APPROVAL_STATUS = [
+        # Created by the first chunked upload on the add-product page, before the form is submitted
+        ('draft', 'Draft'),
         ('pending', 'Pending'),
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
@@ -55,23 +98,61 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', blank=True, null=True)
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products', limit_choices_to={'role': 'seller'})
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0, validators=[MinValueValidator(0), MaxValueValidator(5)])
+    # Running totals of review stars; `rating` is derived from them (see adjust_rating)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    # Reviews per star value, for the histogram on the product page
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     total_sells = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_featured = models.BooleanField(default=False)
     approval_status = models.CharField(max_length=20, choices=APPROVAL_STATUS, default='pending')
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        # One index per catalog access path: equality columns first, then the sort key
+        # (with id as the tie-breaker so cursor pagination never needs an extra sort)
+        indexes = [
+            models.Index(fields=['approval_status', 'stock_status', 'is_featured', '-created_at', '-id'], name='product_featured_idx'),
+            models.Index(fields=['approval_status', 'stock_status', '-created_at', '-id'], name='product_live_idx'),
+            models.Index(fields=['category', 'approval_status', 'stock_status', '-created_at', '-id'], name='product_category_idx'),
+            models.Index(fields=['seller', '-created_at'], name='product_seller_idx'),
+            models.Index(fields=['approval_status', '-created_at', '-id'], name='product_approval_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-    def update_rating_from_reviews(self):
-        """Recalculate rating based on related reviews"""
-        avg_rating = self.reviews.aggregate(avg=Avg('rating'))['avg']
-        self.rating = round(avg_rating or 0, 2)
-        self.save(update_fields=['rating'])
+    @property
+    def primary_image(self):
+        """Image shown on product cards (uses the listing prefetch when present)"""
+        if hasattr(self, 'listing_images'):
+            return self.listing_images[0] if self.listing_images else None
+        return self.images.order_by('-is_primary', 'id').first()
+
+    @property
+    def rating_histogram(self):
+        """(stars, count, percent) rows from 5 stars down, read from the stored counters"""
+        rows = []
+        for stars in reversed(RATING_STARS):
+            count = getattr(self, f'rating_{stars}_count')
+            rows.append((stars, count, round(count * 100 / self.rating_count) if self.rating_count else 0))
+        return rows
+
+    def adjust_rating(self, added=None, removed=None):
+        """Apply one review's star change to the running totals in a single UPDATE"""
+        Product.objects.filter(pk=self.pk).update(**rating_counter_update(added, removed))
+
+        # Listing pages show the rating; the UPDATE skips post_save
+        from .caching import bump_product_versions
+        bump_product_versions(self)
 
 
 class ProductImage(models.Model):
@@ -80,6 +161,9 @@ class ProductImage(models.Model):
     image = models.ImageField(upload_to='products/')
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Resized copies filled in by the variant pool (see variants.py):
+    # {"webp": [[width, name], ...], "fallback": [[width, name], ...]} (JPEG, or PNG with transparency)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.product.name} - Image {self.id}"
@@ -96,6 +180,71 @@ class ProductVideo(models.Model):
         return f"{self.product.name} - Video {self.id}"
 
 
+class ChunkedUpload(models.Model):
+    """An image or video sent to a draft product in chunks (see uploads.py)"""
+    KIND_CHOICES = [
+        ('image', 'Image'),
+        ('video', 'Video'),
+    ]
+
+    # Random ids: the upload URL is the only handle a client keeps between chunks
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='chunked_uploads')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    # Sniffed from the first bytes, not taken from the client
+    content_type = models.CharField(max_length=100, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['completed_at', 'updated_at'], name='upload_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+
+class ImportCheckpoint(models.Model):
+    """Progress of an import_products run, committed in the same transaction as each batch"""
+    name = models.CharField(max_length=255, unique=True)
+    source = models.CharField(max_length=1024)
+    rows_done = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    images = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.rows_done} rows"
+
+
+class CartQuerySet(models.QuerySet):
+    """Cart rows priced in SQL against the joined product"""
+
+    def with_line_totals(self):
+        return self.annotate(line_total=_line_total())
+
+    def summary(self):
+        """{'item_count': units in cart, 'total': amount} in one aggregate query"""
+        return self.aggregate(
+            item_count=Coalesce(Sum('quantity'), 0),
+            total=Coalesce(Sum(_line_total()), Decimal('0.00'), output_field=LINE_TOTAL_FIELD),
+        )
+
+
+LINE_TOTAL_FIELD = models.DecimalField(max_digits=12, decimal_places=2)
+
+
+def _line_total():
+    return ExpressionWrapper(F('quantity') * F('product__price'), output_field=LINE_TOTAL_FIELD)
+
+
 class Cart(models.Model):
     """Shopping cart"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart_items')
@@ -104,6 +253,8 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         unique_together = ['user', 'product']
         ordering = ['-created_at']
@@ -115,6 +266,25 @@ class Cart(models.Model):
         return self.quantity * self.product.price
 
 
+class StockReservation(models.Model):
+    """Time-boxed hold on product quantity while a buyer is in checkout"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'product']
+        indexes = [
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_idx'),
+            models.Index(fields=['expires_at'], name='reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.product.name} x{self.quantity} until {self.expires_at}"
+
+
 class Wishlist(models.Model):
     """Wishlist for buyers"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wishlist_items')
@@ -155,11 +325,29 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # my_orders keyset pagination
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_idx'),
+            # Date range / status filters for exports
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number} - {self.user.username}"
 
 
+class CheckoutSubmission(models.Model):
+    """Idempotency key issued with the checkout form, recorded with the order it produced"""
+    key = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checkout_submissions')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key} - {self.user.username}"
+
+
 class OrderItem(models.Model):
     """Order items"""
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -177,6 +365,60 @@ class OrderItem(models.Model):
         return quantity * price
 
 
+class DailyProductSales(models.Model):
+    """Per-day rollup of units sold and revenue per seller and product, kept up to date by checkout"""
+    day = models.DateField()
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_sales')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        verbose_name_plural = "Daily product sales"
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'day', 'product'], name='daily_sales_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.product.name}: {self.units} sold"
+
+
+def rating_from_counters(rating_sum, rating_count):
+    """Average stars (2 decimals) from sum/count expressions; 0 when there are no reviews"""
+    return Case(
+        When(GreaterThan(rating_count, 0), then=Round(Cast(rating_sum, models.FloatField()) / rating_count, 2)),
+        default=Value(0.0),
+        output_field=models.DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def rating_counter_update(added=None, removed=None):
+    """update() kwargs that add/remove one review's stars: totals, histogram bucket and rating"""
+    new_sum = F('rating_sum') + ((added or 0) - (removed or 0))
+    new_count = F('rating_count') + ((added is not None) - (removed is not None))
+    kwargs = {
+        'rating_sum': new_sum,
+        'rating_count': new_count,
+        'rating': rating_from_counters(new_sum, new_count),
+    }
+    if added != removed:
+        if removed is not None:
+            kwargs[f'rating_{removed}_count'] = F(f'rating_{removed}_count') - 1
+        if added is not None:
+            kwargs[f'rating_{added}_count'] = F(f'rating_{added}_count') + 1
+    return kwargs
+
+
+def order_items_preview_prefetch(limit=3):
+    """Prefetch the first `limit` items of each order, with product names, into `preview_items`"""
+    ranked = OrderItem.objects.select_related('product').only(
+        'id', 'order_id', 'quantity', 'product__id', 'product__name'
+    ).annotate(
+        preview_rank=Window(RowNumber(), partition_by=[F('order_id')], order_by=[F('id').asc()])
+    ).filter(preview_rank__lte=limit)
+    return Prefetch('items', queryset=ranked, to_attr='preview_items')
+
+
 class Review(models.Model):
     """Product reviews"""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -189,16 +431,36 @@ class Review(models.Model):
     class Meta:
         unique_together = ['product', 'user']
         ordering = ['-created_at']
+        # The product page pages through reviews newest first by cursor
+        indexes = [
+            models.Index(fields=['product', '-created_at', '-id'], name='review_product_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.user.username} ({self.rating} stars)"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        review = super().from_db(db, field_names, values)
+        # Stars as stored, so save() can apply just the difference to the product
+        review._loaded_rating = review.__dict__.get('rating')
+        return review
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.product.update_rating_from_reviews()
+        adding = self._state.adding
+        previous = getattr(self, '_loaded_rating', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self.product.adjust_rating(added=self.rating)
+            elif previous != self.rating:
+                self.product.adjust_rating(added=self.rating, removed=previous)
+        self._loaded_rating = self.rating
 
     def delete(self, *args, **kwargs):
         product = self.product
-        super().delete(*args, **kwargs)
-        product.update_rating_from_reviews()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            product.adjust_rating(removed=getattr(self, '_loaded_rating', self.rating))
+        return result
 
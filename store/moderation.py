@@ -0,0 +1,58 @@
+"""
+Approval and rejection of products by staff.
+
+set_approval() changes any number of products with one UPDATE per chunk
+instead of a save() per product, then refreshes what depends on approval
+state in one batch after commit: the search index, the autocomplete index
+and the cached listing pages. The UPDATE skips post_save, so the signal
+handlers in signals.py don't run for these changes.
+"""
+from django.db import transaction
+
+from . import autocomplete, search
+from .caching import HOME_VERSION, bump_version, category_version
+from .models import Product
+
+# Keeps the IN (...) list well under every backend's parameter limit
+CHUNK_SIZE = 1000
+
+
+def set_approval(product_ids, status):
+    """Set approval_status on the given products (drafts are skipped); returns how many changed"""
+    product_ids = sorted({int(product_id) for product_id in product_ids})
+    changed = []
+    with transaction.atomic():
+        for start in range(0, len(product_ids), CHUNK_SIZE):
+            # Drafts are unfinished add-product forms, never up for moderation
+            chunk = Product.objects.filter(id__in=product_ids[start:start + CHUNK_SIZE]).exclude(
+                approval_status__in=[status, 'draft']
+            )
+            rows = list(chunk.select_for_update().values_list('id', 'category_id', 'approval_status'))
+            if rows:
+                chunk.filter(id__in=[product_id for product_id, _, _ in rows]).update(approval_status=status)
+                changed.extend(rows)
+        if changed:
+            transaction.on_commit(lambda: _refresh_dependents(changed, status))
+    return len(changed)
+
+
+def _refresh_dependents(changed, status):
+    """Batch search/autocomplete/page-cache invalidation for (id, category_id, old status) rows"""
+    if status == 'approved':
+        # Every changed product is newly listed
+        listed = changed
+        products = list(Product.objects.filter(id__in=[row[0] for row in listed]).select_related('category'))
+        search.index_products(products)
+        for product in products:
+            autocomplete.sync_product(product)
+    else:
+        # Only products that were approved were indexed, listed or counted
+        listed = [row for row in changed if row[2] == 'approved']
+        search.remove_products(row[0] for row in listed)
+        for row in listed:
+            autocomplete.index.remove('product', row[0])
+
+    if listed:
+        names = {HOME_VERSION}
+        names.update(category_version(category_id) for _, category_id, _ in listed if category_id)
+        bump_version(*names)
@@ -0,0 +1,94 @@
+"""
+Order number generator.
+
+Numbers look like ORD + 9 chars of millisecond timestamp + 7 chars of node
+id + 2 chars of per-process sequence, all upper-case base 36 and fixed
+width, e.g. "ORD0MVCU9S0F0000KQ400". They sort by creation time as plain
+strings and need no database round trip. Because they increase over time,
+inserts land at the right edge of the Order.order_number unique index
+instead of at random pages.
+
+The node id is the host id (settings.ORDER_NUMBER_NODE_ID, default 0) next
+to the process id, so worker processes on one host can never share it.
+Deployments with more than one host must give each host its own
+ORDER_NUMBER_NODE_ID.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+PREFIX = 'ORD'
+TIMESTAMP_WIDTH = 9
+HOST_WIDTH = 2
+# Linux pids go up to 2**22
+PID_WIDTH = 5
+NODE_WIDTH = HOST_WIDTH + PID_WIDTH
+SEQUENCE_WIDTH = 2
+MAX_SEQUENCE = 36 ** SEQUENCE_WIDTH
+
+
+def to_base36(number, width):
+    digits = []
+    for _ in range(width):
+        number, remainder = divmod(number, 36)
+        digits.append(ALPHABET[remainder])
+    if number:
+        raise ValueError(f'{number} does not fit in {width} base-36 digits')
+    return ''.join(reversed(digits))
+
+
+def default_node_id():
+    """Host id from settings ORDER_NUMBER_NODE_ID (default 0) followed by this process's pid"""
+    host_id = int(getattr(settings, 'ORDER_NUMBER_NODE_ID', None) or 0)
+    if not 0 <= host_id < 36 ** HOST_WIDTH:
+        raise ImproperlyConfigured(f'ORDER_NUMBER_NODE_ID must be between 0 and {36 ** HOST_WIDTH - 1}.')
+    return host_id * 36 ** PID_WIDTH + os.getpid()
+
+
+class OrderNumberGenerator:
+    """Thread-safe, strictly increasing order numbers for one process"""
+
+    def __init__(self, node_id=None, clock=None):
+        self.node_id = node_id
+        self.clock = clock or (lambda: int(time.time() * 1000))
+        self.lock = threading.Lock()
+        self.last_millis = -1
+        self.sequence = 0
+
+    def __call__(self):
+        with self.lock:
+            if self.node_id is None:
+                self.node_id = default_node_id()
+            millis = max(self.clock(), self.last_millis)
+            if millis == self.last_millis:
+                self.sequence += 1
+                if self.sequence >= MAX_SEQUENCE:
+                    # Sequence exhausted for this millisecond: borrow the next one
+                    millis += 1
+                    self.sequence = 0
+            else:
+                self.sequence = 0
+            self.last_millis = millis
+            return (
+                PREFIX
+                + to_base36(millis, TIMESTAMP_WIDTH)
+                + to_base36(self.node_id, NODE_WIDTH)
+                + to_base36(self.sequence, SEQUENCE_WIDTH)
+            )
+
+
+next_order_number = OrderNumberGenerator()
+
+
+def _reset_after_fork():
+    """A forked worker must not reuse its parent's node id"""
+    next_order_number.node_id = None
+    next_order_number.lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Bounds a decoded cursor must fall in: datetime's range and a BigAutoField id
+MAX_MICROS = (datetime.max.replace(tzinfo=dt_timezone.utc) - EPOCH) // timedelta(microseconds=1)
+MAX_ID = 2 ** 63 - 1
+
+
+def encode_cursor(direction, number, created_at, pk):
+    """Cursor token like "n3.1700000000123456.42" (direction+page, microseconds, id)"""
+    micros = (created_at - EPOCH) // timedelta(microseconds=1)
+    return f'{direction}{number}.{micros}.{pk}'
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; returns None for missing, malformed or out-of-range tokens"""
+    try:
+        head, micros, pk = (token or '').split('.')
+        direction, number, micros, pk = head[0], int(head[1:]), int(micros), int(pk)
+        if direction not in ('n', 'p') or number < 1 or not 0 <= micros <= MAX_MICROS or not 0 < pk <= MAX_ID:
+            return None
+        return direction, number, EPOCH + timedelta(microseconds=micros), pk
+    except (ValueError, IndexError, OverflowError):
+        return None
+
+
+class CursorPaginator:
+    """Keyset paginator over (created_at, id), newest first.
+
+    Mirrors the parts of django.core.paginator.Paginator the templates use.
+    Pages are addressed by cursor tokens instead of numbers, so a deep page
+    costs the same as the first one. Pass with_count=False to skip COUNT(*);
+    num_pages is then None.
+    """
+
+    def __init__(self, object_list, per_page, with_count=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.with_count = with_count
+
+    @cached_property
+    def count(self):
+        if not self.with_count:
+            return None
+        return self.object_list.count()
+
+    @cached_property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, -(-self.count // self.per_page))
+
+    @property
+    def page_range(self):
+        return range(1, (self.num_pages or 0) + 1)
+
+    def _rows(self, cursor):
+        """Unsliced queryset for the page at `cursor`, in the order it is fetched"""
+        if cursor is None:
+            return self.object_list.order_by('-created_at', '-id')
+        direction, number, created_at, pk = cursor
+        if direction == 'n':
+            return self.object_list.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            ).order_by('-created_at', '-id')
+        return self.object_list.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        ).order_by('created_at', 'id')
+
+    def page_queryset(self, token=None):
+        """The query get_page(token) runs (e.g. to EXPLAIN it)"""
+        return self._rows(decode_cursor(token))[:self.per_page + 1]
+
+    def get_page(self, token):
+        """Return the page for a cursor token; unknown tokens give the first page"""
+        cursor = decode_cursor(token)
+        items = list(self._rows(cursor)[:self.per_page + 1])
+        if cursor is None:
+            return CursorPage(items[:self.per_page], 1, len(items) > self.per_page, False, self)
+
+        direction, number, created_at, pk = cursor
+        if direction == 'n':
+            return CursorPage(items[:self.per_page], number, len(items) > self.per_page, True, self)
+
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        if not has_previous:
+            number = 1
+        return CursorPage(items, number, True, has_previous, self)
+
+
+class CursorPage:
+    """A page of results whose next/previous "numbers" are cursor tokens"""
+
+    def __init__(self, object_list, number, has_next, has_previous, paginator):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+        self.paginator = paginator
+
+    def __repr__(self):
+        return f'<Page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_page_number(self):
+        last = self.object_list[-1]
+        return encode_cursor('n', self.number + 1, last.created_at, last.pk)
+
+    def previous_page_number(self):
+        first = self.object_list[0]
+        return encode_cursor('p', self.number - 1, first.created_at, first.pk)
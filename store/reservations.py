@@ -0,0 +1,95 @@
+"""
+Time-boxed stock reservations.
+
+Opening checkout holds the cart's quantities for HOLD_MINUTES. Other buyers
+see quantity minus active holds as available, so a flash sale fails fast at
+the start of checkout instead of at the final step. Expired holds are simply
+ignored by every query and deleted later in batches by the
+sweep_reservations command.
+
+Like checkout.place_order, backends with row locks lock the products first
+(SELECT ... FOR UPDATE) while SQLite, which locks the whole database, takes
+the write lock with its first statement; a read-then-write transaction there
+deadlocks against concurrent reservations.
+"""
+from datetime import timedelta
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Cart, Product, StockReservation
+
+HOLD_MINUTES = 15
+
+
+def _is_lock_error(error):
+    # "database is locked" (SQLite), "could not obtain lock" / "lock wait timeout" elsewhere
+    return 'lock' in str(error).lower()
+
+
+def reserve_cart(user):
+    """Hold (or refresh the hold on) every item in the user's cart.
+
+    Returns "name (available: n)" strings for items that can't be held.
+    """
+    quantities = dict(Cart.objects.filter(user=user).values_list('product_id', 'quantity'))
+    if not quantities:
+        return []
+    expires_at = timezone.now() + timedelta(minutes=HOLD_MINUTES)
+    try:
+        with transaction.atomic():
+            products = Product.objects.with_available(exclude_user=user).only('id', 'name', 'quantity', 'stock_status')
+            if connection.features.has_select_for_update:
+                products = products.select_for_update(of=('self',))
+            else:
+                # A no-op UPDATE as the first statement takes SQLite's write lock, so
+                # concurrent reservations queue on the busy timeout instead of failing
+                StockReservation.objects.filter(user=user).update(quantity=F('quantity'))
+            products = products.in_bulk(list(quantities))
+
+            shortfalls = []
+            holds = []
+            for product_id, quantity in quantities.items():
+                product = products[product_id]
+                if product.stock_status == 'out_of_stock' or product.available_quantity < quantity:
+                    shortfalls.append(f"{product.name} (available: {max(product.available_quantity, 0)})")
+                else:
+                    holds.append(StockReservation(user=user, product_id=product_id, quantity=quantity, expires_at=expires_at))
+            if holds:
+                StockReservation.objects.bulk_create(
+                    holds,
+                    update_conflicts=True,
+                    unique_fields=['user', 'product'],
+                    update_fields=['quantity', 'expires_at'],
+                )
+    except OperationalError as e:
+        if not _is_lock_error(e):
+            raise
+        # Still contended after the lock timeout; nothing was held, the buyer can retry
+        names = Product.objects.filter(id__in=list(quantities)).values_list('name', flat=True)
+        return [f"{name} (busy, please try again)" for name in names]
+    return shortfalls
+
+
+def release(user, product_ids=None):
+    """Drop the user's holds (all of them, or just for product_ids)"""
+    holds = StockReservation.objects.filter(user=user)
+    if product_ids is not None:
+        holds = holds.filter(product_id__in=list(product_ids))
+    holds.delete()
+
+
+def sweep_expired(batch_size=1000):
+    """Delete expired holds in batches; returns how many were removed"""
+    removed = 0
+    now = timezone.now()
+    while True:
+        ids = list(
+            StockReservation.objects.filter(expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return removed
+        removed += StockReservation.objects.filter(id__in=ids).delete()[0]
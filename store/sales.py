@@ -0,0 +1,145 @@
+"""
+Daily sales rollups for the seller dashboard.
+
+Checkout adds each order's units and revenue to DailyProductSales (one row
+per seller, day and product) in the same transaction, with a single upsert
+that increments existing rows. admin_page then reads all-time totals and
+the 7/30/90-day windows from the rollup in one aggregate query, however
+large the catalog or order history. Migration 0011 fills the table from the
+orders that already existed; backfill_sales_rollups rebuilds it from
+OrderItem.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSales, OrderItem
+
+TREND_PERIODS = (7, 30, 90)
+
+
+def _rollup_rows(lines):
+    """Sum (seller_id, product_id, quantity, price) lines per (seller, product)"""
+    totals = defaultdict(lambda: [0, Decimal('0.00')])
+    for seller_id, product_id, quantity, price in lines:
+        total = totals[seller_id, product_id]
+        total[0] += quantity
+        total[1] += quantity * price
+    return totals
+
+
+def record_sales(lines, day=None):
+    """Add sold lines (seller_id, product_id, quantity, price) to the day's rollup rows"""
+    totals = _rollup_rows(lines)
+    if not totals:
+        return
+    day = day or timezone.localdate()
+    table = DailyProductSales._meta.db_table
+
+    if connection.vendor in ('sqlite', 'postgresql'):
+        values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(totals))
+        params = []
+        for (seller_id, product_id), (units, revenue) in totals.items():
+            params.extend([day, seller_id, product_id, units, revenue])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (day, seller_id, product_id, units, revenue) VALUES {values} "
+                f"ON CONFLICT (seller_id, day, product_id) DO UPDATE SET "
+                f"units = {table}.units + excluded.units, revenue = {table}.revenue + excluded.revenue",
+                params,
+            )
+        return
+
+    # Other backends: lock-and-increment, creating the rows that don't exist yet
+    with transaction.atomic():
+        for (seller_id, product_id), (units, revenue) in totals.items():
+            updated = DailyProductSales.objects.filter(seller_id=seller_id, product_id=product_id, day=day).update(
+                units=F('units') + units, revenue=F('revenue') + revenue
+            )
+            if not updated:
+                DailyProductSales.objects.create(
+                    seller_id=seller_id, product_id=product_id, day=day, units=units, revenue=revenue
+                )
+
+
+def rebuild(start=None, end=None, batch_size=1000, apps=None):
+    """Recompute rollup rows from OrderItem for days in [start, end]; returns rows written.
+
+    Migrations pass their app registry as `apps` to run it on the historical models.
+    """
+    rollup_model = apps.get_model('store', 'DailyProductSales') if apps else DailyProductSales
+    item_model = apps.get_model('store', 'OrderItem') if apps else OrderItem
+    items = item_model.objects.annotate(day=TruncDate('order__created_at'))
+    rollups = rollup_model.objects.all()
+    if start:
+        items = items.filter(day__gte=start)
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        items = items.filter(day__lte=end)
+        rollups = rollups.filter(day__lte=end)
+    grouped = items.order_by().values('day', 'product__seller_id', 'product_id').annotate(
+        units=Sum('quantity'),
+        revenue=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+    )
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(rollup_model(
+                day=row['day'],
+                seller_id=row['product__seller_id'],
+                product_id=row['product_id'],
+                units=row['units'],
+                revenue=row['revenue'],
+            ))
+            if len(batch) >= batch_size:
+                rollup_model.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        rollup_model.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def seller_summary(seller, today=None):
+    """All-time and 7/30/90-day units and revenue for a seller, in one query.
+
+    Each period also has the preceding period of the same length, so the
+    dashboard can show a trend.
+    """
+    today = today or timezone.localdate()
+    money = DecimalField(max_digits=12, decimal_places=2)
+
+    def units(q=None):
+        return Coalesce(Sum('units', filter=q), 0)
+
+    def revenue(q=None):
+        return Coalesce(Sum('revenue', filter=q), Decimal('0.00'), output_field=money)
+
+    aggregates = {'total_units': units(), 'total_revenue': revenue()}
+    for days in TREND_PERIODS:
+        current = Q(day__gt=today - timedelta(days=days))
+        previous = Q(day__gt=today - timedelta(days=2 * days), day__lte=today - timedelta(days=days))
+        aggregates[f'units_{days}'] = units(current)
+        aggregates[f'revenue_{days}'] = revenue(current)
+        aggregates[f'previous_revenue_{days}'] = revenue(previous)
+    totals = DailyProductSales.objects.filter(seller=seller).aggregate(**aggregates)
+
+    periods = []
+    for days in TREND_PERIODS:
+        current, previous = totals[f'revenue_{days}'], totals[f'previous_revenue_{days}']
+        periods.append({
+            'days': days,
+            'units': totals[f'units_{days}'],
+            'revenue': current,
+            'previous_revenue': previous,
+            'change': round((current - previous) * 100 / previous) if previous else None,
+        })
+    return {'units': totals['total_units'], 'revenue': totals['total_revenue'], 'periods': periods}
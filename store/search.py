@@ -0,0 +1,143 @@
+"""
+Full-text product search.
+
+SQLite keeps an FTS5 table (store_product_fts) ranked with BM25; PostgreSQL
+keeps a tsvector table with a GIN index ranked with ts_rank_cd. Only approved
+products are indexed. Other backends fall back to icontains filtering.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+FTS_TABLE = 'store_product_fts'
+
+# Relevance beyond the first few hundred hits is noise; keeps ranking bounded
+MAX_RESULTS = 500
+
+# BM25 column weights for (name, category, description)
+SQLITE_WEIGHTS = (10.0, 5.0, 1.0)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _document(product):
+    category = product.category.name if product.category_id else ''
+    return product.name, category, product.description
+
+
+def _insert(cursor, products):
+    if connection.vendor == 'sqlite':
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, category, description) VALUES (%s, %s, %s, %s)",
+            [(product.pk, *_document(product)) for product in products],
+        )
+    else:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (product_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('english', %s), 'A') || "
+            f"setweight(to_tsvector('english', %s), 'B') || "
+            f"setweight(to_tsvector('english', %s), 'C')) "
+            f"ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+            [(product.pk, *_document(product)) for product in products],
+        )
+
+
+def remove_products(product_ids):
+    """Drop products from the index"""
+    product_ids = list(product_ids)
+    if not product_ids or not is_supported():
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'product_id'
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE {column} IN ({placeholders})", product_ids)
+
+
+def index_products(products):
+    """Add or refresh products in the index; unapproved ones are removed"""
+    products = list(products)
+    if not products or not is_supported():
+        return
+    approved = [product for product in products if product.approval_status == 'approved']
+    with transaction.atomic():
+        remove_products(product.pk for product in products)
+        if approved:
+            with connection.cursor() as cursor:
+                _insert(cursor, approved)
+
+
+def rebuild_index(batch_size=1000):
+    """Rebuild the whole index from approved products; returns the number indexed"""
+    from .models import Product
+
+    if not is_supported():
+        return 0
+    total = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            batch = []
+            products = Product.objects.filter(approval_status='approved').select_related('category')
+            for product in products.iterator(chunk_size=batch_size):
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    _insert(cursor, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                _insert(cursor, batch)
+                total += len(batch)
+            if connection.vendor == 'sqlite':
+                cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def _fts5_query(query):
+    """Quote each word (so user input can't inject FTS5 syntax) and prefix-match it"""
+    words = WORD_RE.findall(query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def ranked_product_ids(query, limit=MAX_RESULTS):
+    """Ids of approved products matching query, best match first.
+
+    Category, stock and other facet filters are applied by the caller on the
+    returned ids. Returns None when the backend has no full-text index, so
+    callers can fall back to icontains filtering.
+    """
+    if not is_supported():
+        return None
+
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(query)
+        if not match:
+            return []
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        sql = (
+            f"SELECT p.id FROM {FTS_TABLE} JOIN store_product p ON p.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND p.approval_status = 'approved' "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}), p.id DESC LIMIT %s"
+        )
+        params = [match, limit]
+    else:
+        sql = (
+            f"SELECT p.id FROM {FTS_TABLE} f JOIN store_product p ON p.id = f.product_id, "
+            f"plainto_tsquery('english', %s) q "
+            f"WHERE f.document @@ q AND p.approval_status = 'approved' "
+            f"ORDER BY ts_rank_cd(f.document, q) DESC, p.id DESC LIMIT %s"
+        )
+        params = [query, limit]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def fallback_filter(products, query):
+    """Unindexed substring match for backends without a full-text index"""
+    return products.filter(Q(name__icontains=query) | Q(description__icontains=query))
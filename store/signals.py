@@ -0,0 +1,106 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import autocomplete, search, variants
+from .caching import CATEGORIES_VERSION, bump_product_versions, bump_version, purchases_version
+from .models import Category, Order, OrderItem, Product, ProductImage
+
+SEARCH_FIELDS = {'name', 'description', 'category', 'approval_status'}
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Approval, rejection and edits (which reset to pending) all land here"""
+    if raw or (update_fields and not SEARCH_FIELDS.intersection(update_fields)):
+        return
+    search.index_products([instance])
+    autocomplete.sync_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_on_delete(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+    autocomplete.index.remove('product', instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created=False, raw=False, **kwargs):
+    """The category name is part of each product's indexed text"""
+    if raw:
+        return
+    if autocomplete.index.built_at is not None:
+        autocomplete.index.add('category', instance.slug, instance.name)
+    if created:
+        return
+    search.index_products(instance.products.filter(approval_status='approved').select_related('category'))
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category_on_delete(sender, instance, **kwargs):
+    autocomplete.index.remove('category', instance.slug)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_categories_on_category_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version(CATEGORIES_VERSION)
+
+
+@receiver(post_init, sender=Product)
+def remember_listing_state(sender, instance, **kwargs):
+    """Lets the page cache invalidate the category a product moved away from"""
+    instance._loaded_category_id = instance.__dict__.get('category_id')
+    instance._loaded_approval_status = instance.__dict__.get('approval_status')
+
+
+@receiver(post_save, sender=Product)
+def bump_versions_on_product_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_product_versions(instance)
+    instance._loaded_category_id = instance.category_id
+    instance._loaded_approval_status = instance.approval_status
+
+
+@receiver(post_delete, sender=Product)
+def bump_versions_on_product_delete(sender, instance, **kwargs):
+    bump_product_versions(instance, deleted=True)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def bump_purchases_on_order_change(sender, instance, created=False, raw=False, **kwargs):
+    """Status edits and deletions can change what a buyer may review; checkout marks new orders itself"""
+    if not raw and not created:
+        bump_version(purchases_version(instance.user_id))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def bump_purchases_on_order_item_change(sender, instance, raw=False, **kwargs):
+    """Items edited outside checkout (the admin inline); bulk_create at checkout sends no signal"""
+    if raw:
+        return
+    user_id = Order.objects.filter(pk=instance.order_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        bump_version(purchases_version(user_id))
+
+
+@receiver(post_init, sender=ProductImage)
+def remember_image_name(sender, instance, **kwargs):
+    image = instance.__dict__.get('image')
+    instance._loaded_image_name = getattr(image, 'name', image)
+
+
+@receiver(post_save, sender=ProductImage)
+def build_variants_on_image_save(sender, instance, created=False, raw=False, **kwargs):
+    """New uploads (add_product, edit_product, the admin) get resized copies in the background"""
+    if raw or (not created and instance.image.name == instance._loaded_image_name):
+        return
+    if not created and instance.variants:
+        # The old copies belong to the replaced file
+        ProductImage.objects.filter(pk=instance.pk).update(variants={})
+        instance.variants = {}
+    instance._loaded_image_name = instance.image.name
+    variants.schedule([instance])
@@ -0,0 +1,36 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+def _srcset(entries):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in entries)
+
+
+@register.simple_tag
+def responsive_image(image, sizes, alt='', **attrs):
+    """<picture> serving the WebP/JPEG variants of a ProductImage sized by `sizes`.
+
+    Extra keyword arguments become <img> attributes (underscores turn into
+    hyphens, so data_full="..." renders data-full="..."). Until the variants
+    exist, a plain <img> of the original upload is rendered.
+    """
+    if not image:
+        return ''
+    attributes = format_html_join('', ' {}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items()))
+    variants = image.variants or {}
+    fallback = variants.get('fallback')
+    if not fallback:
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', image.image.url, alt, attributes)
+
+    # The src is the largest copy, for browsers without srcset support
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy"{}>'
+        '</picture>',
+        _srcset(variants.get('webp', [])), sizes,
+        default_storage.url(fallback[-1][1]), _srcset(fallback), sizes, alt, attributes,
+    )
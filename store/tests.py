@@ -0,0 +1,168 @@
+import threading
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from . import checkout
+from .caching import CATEGORIES_VERSION, HOME_VERSION, category_version, get_version
+from .media import RangeNotSatisfiable, parse_range
+from .models import Cart, Category, Order, OrderItem, Product, User
+from .pagination import decode_cursor, encode_cursor
+from .uploads import UploadError, parse_content_range
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Many buyers checking out the last units of one product at once"""
+
+    BUYERS = 20
+    STOCK = 3
+
+    def setUp(self):
+        seller = User.objects.create_user('seller', password='pw-12345678', role='seller')
+        category = Category.objects.create(name='Pottery', slug='pottery')
+        self.product = Product.objects.create(
+            name='Clay pot', description='Handmade terracotta pot', price=Decimal('250.00'),
+            quantity=self.STOCK, category=category, seller=seller, approval_status='approved',
+        )
+        self.buyers = [User.objects.create_user(f'buyer{i}', password='pw-12345678') for i in range(self.BUYERS)]
+        Cart.objects.bulk_create([Cart(user=buyer, product=self.product, quantity=1) for buyer in self.buyers])
+
+    def _checkout(self, buyer, barrier, results, lock):
+        barrier.wait()
+        try:
+            checkout.place_order(buyer, 'Address', '380001', 'cash_on_delivery', timezone.localdate())
+            outcome = 'ok'
+        except checkout.InsufficientStock:
+            outcome = 'insufficient'
+        except Exception as e:
+            outcome = repr(e)
+        finally:
+            connection.close()
+        with lock:
+            results.append(outcome)
+
+    def test_no_oversell(self):
+        results = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.BUYERS)
+        threads = [
+            threading.Thread(target=self._checkout, args=(buyer, barrier, results, lock))
+            for buyer in self.buyers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count('ok'), self.STOCK, results)
+        self.assertEqual(results.count('insufficient'), self.BUYERS - self.STOCK, results)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+        self.assertEqual(self.product.total_sells, self.STOCK)
+        self.assertEqual(self.product.stock_status, 'out_of_stock')
+        self.assertEqual(Order.objects.count(), self.STOCK)
+        self.assertEqual(OrderItem.objects.filter(product=self.product).count(), self.STOCK)
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        created_at = datetime(2026, 10, 17, 12, 30, 0, 123456, tzinfo=dt_timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor('n', 3, created_at, 42)), ('n', 3, created_at, 42))
+
+    def test_malformed_tokens_start_over(self):
+        for token in (
+            None, '', 'n', 'n1.2', 'n1.2.3.4', 'x1.5.5', 'n0.5.5', 'n-1.5.5', 'n.5.5', 'na.5.5', 'n1.abc.5',
+            'n1.5.0', 'n1.-5.5', 'n1.5.-5', f'n1.5.{2 ** 63}', f'n1.{10 ** 30}.5', 'n1.1e3.5',
+        ):
+            with self.subTest(token=token):
+                self.assertIsNone(decode_cursor(token))
+
+
+class RangeHeaderTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=900-5000', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_malformed_headers_send_the_whole_file(self):
+        for header in (None, '', 'bytes=', 'bytes=-', 'bytes=a-b', 'items=0-9', 'bytes=0-9,20-29', 'bytes=9-0'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1000))
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=1000-', f'bytes={10 ** 30}-', 'bytes=-0'):
+            with self.subTest(header=header):
+                with self.assertRaises(RangeNotSatisfiable):
+                    parse_range(header, 1000)
+
+
+class ContentRangeTests(SimpleTestCase):
+    upload = SimpleNamespace(size=100)
+
+    def test_chunk(self):
+        self.assertEqual(parse_content_range('bytes 0-9/100', self.upload), (0, 10))
+        self.assertEqual(parse_content_range('bytes 90-99/100', self.upload), (90, 10))
+
+    def test_malformed(self):
+        for header, status in (
+            (None, 400), ('', 400), ('bytes 0-9', 400), ('bytes=0-9/100', 400), ('bytes 0-9/*', 400),
+            ('bytes a-9/100', 400), ('bytes 9-0/100', 416), ('bytes 0-9/99', 416),
+        ):
+            with self.subTest(header=header):
+                with self.assertRaises(UploadError) as raised:
+                    parse_content_range(header, self.upload)
+                self.assertEqual(raised.exception.status, status)
+
+
+class CacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user('seller', password='pw-12345678', role='seller')
+        self.pottery = Category.objects.create(name='Pottery', slug='pottery')
+        self.textiles = Category.objects.create(name='Textiles', slug='textiles')
+
+    def _versions(self):
+        names = (HOME_VERSION, CATEGORIES_VERSION, category_version(self.pottery.pk), category_version(self.textiles.pk))
+        return {name: get_version(name) for name in names}
+
+    def test_evicted_version_does_not_restart_low(self):
+        before = get_version(HOME_VERSION)
+        cache.delete(f'version:{HOME_VERSION}')
+        self.assertGreater(before, 2)
+        self.assertNotEqual(get_version(HOME_VERSION), before)
+
+    def test_product_changes_bump_only_home_and_their_category(self):
+        product = Product.objects.create(
+            name='Clay pot', description='Pot', price=Decimal('250.00'), quantity=3,
+            category=self.pottery, seller=self.seller,
+        )
+        before = self._versions()
+        product.approval_status = 'approved'
+        product.save()
+        after = self._versions()
+        self.assertNotEqual(after[HOME_VERSION], before[HOME_VERSION])
+        self.assertNotEqual(after[category_version(self.pottery.pk)], before[category_version(self.pottery.pk)])
+        self.assertEqual(after[category_version(self.textiles.pk)], before[category_version(self.textiles.pk)])
+        self.assertEqual(after[CATEGORIES_VERSION], before[CATEGORIES_VERSION])
+
+    def test_pending_product_changes_bump_nothing(self):
+        before = self._versions()
+        Product.objects.create(
+            name='Shawl', description='Shawl', price=Decimal('900.00'), quantity=1,
+            category=self.textiles, seller=self.seller,
+        )
+        self.assertEqual(self._versions(), before)
+
+    def test_page_cache_ignores_unknown_parameters(self):
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get('/?x=1')['X-Page-Cache'], 'hit')
+        self.assertEqual(self.client.get('/?page=2')['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get('/category/pottery/?stock=all&junk=1')['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get('/category/pottery/?junk=2&stock=all')['X-Page-Cache'], 'hit')
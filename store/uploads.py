@@ -0,0 +1,271 @@
+"""
+Chunked, resumable uploads of product images and videos.
+
+A client starts an upload (which creates a draft product if it doesn't name
+one), then sends the file as a series of raw request bodies, each tagged
+with its byte offset. Every chunk is streamed from the request straight
+onto the end of a partial file outside MEDIA_ROOT, so neither the chunk nor
+the file is ever held in memory. ChunkedUpload.received says how far the
+file got; a client that lost its connection asks for it and carries on
+from there.
+
+The first chunk is sniffed against known image/video signatures; the name
+and Content-Type the client sent are never trusted. When the last byte
+arrives the partial file is moved (not copied) into storage and attached to
+the product as a ProductImage or ProductVideo.
+
+Drafts whose add-product form is never submitted are deleted, with their
+files, by sweep_drafts() once no upload to them has moved for a while.
+"""
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import ChunkedUpload, Product, ProductImage, ProductVideo
+from .variants import delete_unreferenced, variant_names
+
+MAX_SIZES = {
+    'image': 20 * 1024 * 1024,
+    'video': 1024 * 1024 * 1024,
+}
+# What clients are told to send per request, and the most a request may carry
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+COPY_BLOCK = 64 * 1024
+# Enough of the file to recognise every signature below
+SNIFF_BYTES = 16
+
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'video/mp4': 'mp4',
+    'video/quicktime': 'mov',
+    'video/webm': 'webm',
+}
+
+
+# Largest id a database integer column holds; bigger ones overflow the query
+MAX_PRODUCT_ID = 2 ** 63 - 1
+
+
+class UploadError(Exception):
+    """Rejected upload request; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def parse_content_range(header, upload):
+    """(offset, length) from a "bytes <first>-<last>/<total>" header for this upload"""
+    match = CONTENT_RANGE.match((header or '').strip())
+    if not match:
+        raise UploadError('Chunks need a "Content-Range: bytes <first>-<last>/<total>" header.')
+    first, last, total = (int(value) for value in match.groups())
+    if total != upload.size or last < first:
+        raise UploadError('Content-Range does not match this upload.', 416)
+    return first, last - first + 1
+
+
+def sniff(head):
+    """(kind, content type) for the first bytes of a file, or (None, None)"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image', 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image', 'image/png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image', 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image', 'image/webp'
+    if head[4:8] == b'ftyp':
+        return 'video', 'video/quicktime' if head[8:12] == b'qt  ' else 'video/mp4'
+    if head.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'video', 'video/webm'
+    return None, None
+
+
+def partial_dir():
+    # Outside MEDIA_ROOT so half-written files are never served
+    return Path(settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir()) / 'store-uploads'
+
+
+def partial_path(upload):
+    return partial_dir() / f'{upload.pk}.part'
+
+
+def start(user, kind, filename, size, product_id=None):
+    """Register an upload; attaches to the user's draft `product_id` or a new draft product"""
+    if kind not in MAX_SIZES:
+        raise UploadError('Unknown upload kind.')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('File size is required.') from None
+    if product_id is not None and not (str(product_id).isdigit() and int(product_id) <= MAX_PRODUCT_ID):
+        raise UploadError('Invalid product.')
+    if size <= 0 or size > MAX_SIZES[kind]:
+        raise UploadError(f'{kind.title()}s must be between 1 byte and {MAX_SIZES[kind] // (1024 * 1024)} MB.', 413)
+
+    with transaction.atomic():
+        if product_id:
+            product = Product.objects.filter(pk=product_id, seller=user, approval_status='draft').first()
+            if product is None:
+                raise UploadError('Uploads can only be added to your own draft products.', 404)
+        else:
+            product = Product.objects.create(seller=user, name='', description='', price=0, approval_status='draft')
+        upload = ChunkedUpload.objects.create(
+            user=user, product=product, kind=kind, filename=os.path.basename(filename or '')[:255], size=size,
+        )
+    partial_dir().mkdir(parents=True, exist_ok=True)
+    partial_path(upload).touch()
+    return upload
+
+
+def _copy(stream, destination, length):
+    """Copy up to `length` bytes in COPY_BLOCK pieces; returns how many arrived"""
+    remaining = length
+    while remaining:
+        block = stream.read(min(COPY_BLOCK, remaining))
+        if not block:
+            break
+        destination.write(block)
+        remaining -= len(block)
+    return length - remaining
+
+
+def append(upload, offset, length, stream):
+    """Write `length` bytes from `stream` at `offset`; returns the updated upload.
+
+    The offset must be where the previous chunk ended. Bytes that arrive
+    before a dropped connection are kept, so the client can resume from
+    upload.received. Completes the upload when the last byte is in.
+    """
+    if upload.completed_at:
+        raise UploadError('This upload is already complete.', 409)
+    if offset != upload.received:
+        raise UploadError(f'Expected offset {upload.received}.', 409)
+    if length <= 0 or length > MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunks must be between 1 byte and {MAX_CHUNK_SIZE // (1024 * 1024)} MB.', 413)
+    if offset + length > upload.size:
+        raise UploadError('Chunk runs past the declared file size.', 416)
+
+    path = partial_path(upload)
+    try:
+        with open(path, 'r+b') as destination:
+            # Drop anything past the confirmed offset (e.g. from an interrupted attempt)
+            destination.seek(offset)
+            destination.truncate()
+            written = _copy(stream, destination, length)
+    except FileNotFoundError:
+        raise UploadError('This upload has expired.', 410) from None
+
+    if offset == 0 and written < length:
+        # Dropped before the signature could be checked; the client starts over
+        written = 0
+    elif offset == 0:
+        with open(path, 'rb') as source:
+            head = source.read(SNIFF_BYTES)
+        kind, content_type = sniff(head)
+        if len(head) < min(SNIFF_BYTES, upload.size) or kind != upload.kind:
+            cancel(upload)
+            raise UploadError(f'This file is not a supported {upload.kind} format.', 415)
+        upload.content_type = content_type
+
+    # Guarded on the offset so a racing duplicate chunk can't double-count
+    moved = ChunkedUpload.objects.filter(pk=upload.pk, received=offset, completed_at__isnull=True).update(
+        received=offset + written, content_type=upload.content_type, updated_at=timezone.now(),
+    )
+    if not moved:
+        upload.refresh_from_db()
+        raise UploadError(f'Expected offset {upload.received}.', 409)
+    upload.received = offset + written
+    if upload.received == upload.size:
+        finish(upload)
+    return upload
+
+
+class _PartialFile(File):
+    """Lets FileSystemStorage move the partial file into place instead of copying it"""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def finish(upload):
+    """Move the complete file into storage and attach it to the upload's product"""
+    field = ProductImage._meta.get_field('image') if upload.kind == 'image' else ProductVideo._meta.get_field('video')
+    stem = slugify(os.path.splitext(upload.filename)[0]) or upload.kind
+    name = f'{field.upload_to}{stem}.{EXTENSIONS[upload.content_type]}'
+    path = partial_path(upload)
+    with transaction.atomic():
+        if not ChunkedUpload.objects.filter(pk=upload.pk, completed_at__isnull=True).update(completed_at=timezone.now()):
+            raise UploadError('This upload is already complete.', 409)
+        with open(path, 'rb') as f:
+            stored = default_storage.save(name, _PartialFile(f, name=str(path)))
+        if upload.kind == 'image':
+            has_primary = upload.product.images.filter(is_primary=True).exists()
+            upload.attached = ProductImage.objects.create(product=upload.product, image=stored, is_primary=not has_primary)
+        else:
+            upload.attached = ProductVideo.objects.create(product=upload.product, video=stored)
+    # Storage backends that copy leave the partial file behind
+    path.unlink(missing_ok=True)
+    upload.completed_at = timezone.now()
+    return upload
+
+
+def cancel(upload):
+    partial_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def sweep_stale(older_than, batch_size=1000):
+    """Delete unfinished uploads untouched since `older_than`, with their partial files; returns how many"""
+    removed = 0
+    stale = ChunkedUpload.objects.filter(completed_at__isnull=True, updated_at__lt=older_than)
+    while True:
+        ids = list(stale.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        for upload_id in ids:
+            (partial_dir() / f'{upload_id}.part').unlink(missing_ok=True)
+        removed += ChunkedUpload.objects.filter(pk__in=ids).delete()[0]
+
+
+def sweep_drafts(older_than, batch_size=1000):
+    """Delete draft products with no upload activity since `older_than`, and their files; returns how many"""
+    recent = ChunkedUpload.objects.filter(product=OuterRef('pk')).filter(
+        Q(updated_at__gte=older_than) | Q(completed_at__gte=older_than)
+    )
+    stale = Product.objects.filter(approval_status='draft', created_at__lt=older_than).exclude(Exists(recent))
+    removed = 0
+    while True:
+        ids = list(stale.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        with transaction.atomic():
+            # Re-checked inside the transaction: the form may have just completed one of them
+            drafts = Product.objects.filter(pk__in=ids, approval_status='draft')
+            names = []
+            derived = []
+            for image, image_variants in ProductImage.objects.filter(product__in=drafts).values_list('image', 'variants'):
+                names.append(image)
+                derived.extend(variant_names(image_variants))
+            names.extend(ProductVideo.objects.filter(product__in=drafts).values_list('video', flat=True))
+            removed += drafts.delete()[1].get(Product._meta.label, 0)
+        for name in names:
+            default_storage.delete(name)
+        delete_unreferenced(derived)
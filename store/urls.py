@@ -11,19 +11,25 @@ urlpatterns = [
     # Products
     path('category/<slug:category_slug>/', views.category_products, name='category_products'),
     path('product/<int:product_id>/', views.product_detail, name='product_detail'),
+    path('product/<int:product_id>/reviews/', views.product_reviews, name='product_reviews'),
     path('search/', views.search_products, name='search_products'),
+    path('search/autocomplete/', views.search_autocomplete, name='search_autocomplete'),
     
     # Admin (Seller only)
     path('admin-page/', views.admin_page, name='admin_page'),
     path('add-product/', views.add_product, name='add_product'),
+    path('uploads/', views.start_upload, name='start_upload'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
     path('edit-product/<int:product_id>/', views.edit_product, name='edit_product'),
     path('delete-product/<int:product_id>/', views.delete_product, name='delete_product'),
     path('add-category/', views.add_category, name='add_category'),
+    path('export/<str:dataset>/', views.export_data, name='export_data'),
     
     # Admin Product Approval (Staff/Superuser only)
     path('pending-products/', views.pending_products, name='pending_products'),
     path('approve-product/<int:product_id>/', views.approve_product, name='approve_product'),
     path('reject-product/<int:product_id>/', views.reject_product, name='reject_product'),
+    path('moderate-products/', views.moderate_products, name='moderate_products'),
     
     # Cart and Wishlist
     path('cart/', views.cart, name='cart'),
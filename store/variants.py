@@ -0,0 +1,112 @@
+"""
+Responsive derivatives of product images.
+
+Uploads only record the original in the request. schedule() hands the
+resizing (images.make_variants) to a process pool once the transaction
+commits, and the pool's result thread stores the files and fills
+ProductImage.variants. Derivative names embed a hash of their content, so
+they never change in place and can be cached indefinitely. Images whose
+variants are still missing fall back to the original upload in templates;
+the build_image_variants command covers existing media.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+from .images import ImageError, make_variants
+from .models import ProductImage
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'products/variants/'
+# Matches names built by variant_name(); media.py serves these as immutable
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[a-z0-9]+$')
+POOL_WORKERS = 2
+
+_pool = None
+
+
+def variant_name(source_name, width, extension, data):
+    """Storage name like "products/variants/vase-300w.3f9a1c2b7d4e.webp" (content-addressed)"""
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f'{VARIANT_DIR}{stem}-{width}w.{digest}.{extension}'
+
+
+def save_variants(source_name, results):
+    """Write make_variants() output to storage; returns the ProductImage.variants value"""
+    variants = {'webp': [], 'fallback': []}
+    for width, extension, data in results:
+        name = variant_name(source_name, width, extension, data)
+        # Same name means same bytes, so an existing file is already right
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(data))
+        variants['webp' if extension == 'webp' else 'fallback'].append([width, name])
+    return variants
+
+
+def variant_names(variants):
+    """Storage names in a ProductImage.variants value"""
+    return [name for sizes in (variants or {}).values() for _, name in sizes]
+
+
+def delete_unreferenced(names):
+    """Delete variant files no ProductImage refers to (names are content-addressed, so shared)"""
+    for name in names:
+        if not ProductImage.objects.filter(variants__icontains=name).exists():
+            default_storage.delete(name)
+
+
+def store_variants(image_id, source_name, results):
+    """Save variants and record them on the image; returns False if the image changed meanwhile"""
+    variants = save_variants(source_name, results)
+    # The upload may have been replaced or deleted while the pool was busy
+    return bool(ProductImage.objects.filter(pk=image_id, image=source_name).update(variants=variants))
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: workers only need Pillow, not a fork of a threaded web process
+        _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _finished(image_id, source_name, future):
+    try:
+        store_variants(image_id, source_name, future.result())
+    except ImageError as e:
+        logger.warning('No variants for product image %s: %s', image_id, e)
+    except Exception:
+        logger.exception('Building variants for product image %s failed', image_id)
+    finally:
+        # Runs on the pool's result thread, which keeps its own DB connection
+        connections.close_all()
+
+
+def _submit(images):
+    global _pool
+    for image in images:
+        try:
+            future = _get_pool().submit(make_variants, image.image.path)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory), which breaks the pool for good
+            _pool = None
+            future = _get_pool().submit(make_variants, image.image.path)
+        future.add_done_callback(partial(_finished, image.pk, image.image.name))
+
+
+def schedule(images):
+    """Build variants for the given ProductImages in the background after the current transaction commits"""
+    images = [image for image in images if image.image]
+    if images:
+        transaction.on_commit(partial(_submit, images))
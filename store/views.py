@@ -3,36 +3,36 @@ from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery
 from django.utils import timezone
-from django.http import JsonResponse
-from django.db.models import Q
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from datetime import timedelta
-from django.utils.http import urlencode
-import random
-import string
+from django.utils.http import url_has_allowed_host_and_scheme, urlencode
+from django.views.decorators.http import require_safe
 
-from .models import User, Product, Category, Cart, Wishlist, Order, OrderItem, ProductImage, ProductVideo, Review
+from .models import User, Product, Category, Cart, ChunkedUpload, Wishlist, Order, OrderItem, ProductImage, ProductVideo, Review
+from .models import order_items_preview_prefetch, primary_image_prefetch
 from .forms import UserRegistrationForm, ProductForm, UserSettingsForm, ReviewForm
+from .caching import (
+    anonymous_page_cache, cached_categories, category_page_versions, has_purchased as cached_has_purchased,
+    home_page_versions, invalidate_cart_summary,
+)
+from .pagination import CursorPaginator
+from . import autocomplete, checkout, exports, facets, guest_cart, listings, media, moderation, reservations, sales, uploads
 
 
+@anonymous_page_cache(home_page_versions)
 def home(request):
     """Home page with featured products"""
-    featured_products = Product.objects.filter(
-        is_featured=True,
-        stock_status='in_stock',
-        approval_status='approved'
-    ).order_by('-created_at')
+    featured_products = listings.home_products()
     
     # If no featured products, show recent products
     if not featured_products.exists():
-        featured_products = Product.objects.filter(
-            stock_status='in_stock',
-            approval_status='approved'
-        ).order_by('-created_at')
+        featured_products = listings.home_products(featured=False)
     
-    paginator = Paginator(featured_products, 8)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(featured_products, listings.HOME_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
         'featured_products': page_obj,
@@ -43,41 +43,48 @@ def home(request):
 
 
 def search_products(request):
-    """Search products by name or description (optionally filtered by category)"""
+    """Search products by name, description or category, with facet filters"""
     query = request.GET.get('q', '').strip()
     category_value = request.GET.get('category')
     category_param_present = 'category' in request.GET
     category_slug = (category_value or '').strip()
     
-    products = Product.objects.filter(stock_status='in_stock', approval_status='approved')
+    categories = cached_categories()
     selected_category = None
     
     if category_slug:
-        selected_category = Category.objects.filter(slug=category_slug).first()
-        if selected_category:
-            products = products.filter(category=selected_category)
-    
-    if query:
-        products = products.filter(
-            Q(name__icontains=query) | Q(description__icontains=query)
-        )
-        total_results = products.count()
-    elif selected_category or category_param_present:
-        total_results = products.count()
+        selected_category = next((category for category in categories if category.slug == category_slug), None)
+    
+    filters = facets.parse_filters(request.GET)
+    filters['category'] = selected_category
+    products, ranked_ids = listings.search_products(query, browsing=bool(selected_category or category_param_present))
+    
+    facet_groups = []
+    total_results = 0
+    if query or selected_category or category_param_present:
+        counts = facets.cached_facet_counts(['search', query], products, filters, categories)
+        total_results = counts['total']
+        facet_groups = facets.build_facets(request.GET, filters, counts, categories)
+    products = listings.filtered(products, filters)
+    
+    if ranked_ids is not None:
+        # Full-text hits come back best match first, so page through the ranked ids
+        matching_ids = set(products.values_list('id', flat=True))
+        ranked_ids = [pk for pk in ranked_ids if pk in matching_ids]
+        page_obj = Paginator(ranked_ids, listings.SEARCH_PER_PAGE).get_page(request.GET.get('page'))
+        products_by_id = products.in_bulk(page_obj.object_list)
+        page_obj.object_list = [products_by_id[pk] for pk in page_obj.object_list if pk in products_by_id]
     else:
-        products = products.none()
-        total_results = 0
-    
-    # Pagination - 12 products per page
-    paginator = Paginator(products, 8)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        # Pagination - 8 products per page; total_results above already holds the count
+        paginator = CursorPaginator(products, listings.SEARCH_PER_PAGE, with_count=False)
+        page_obj = paginator.get_page(request.GET.get('page'))
     
     query_params = {}
     if query:
         query_params['q'] = query
     if category_param_present:
         query_params['category'] = category_slug
+    query_params.update({name: request.GET[name] for name in facets.FACET_PARAMS if request.GET.get(name)})
     pagination_query = urlencode(query_params)
     
     context = {
@@ -90,10 +97,17 @@ def search_products(request):
         'category_param_present': category_param_present,
         'has_filters': bool(query or selected_category or category_param_present),
         'pagination_query': pagination_query,
+        'facet_groups': facet_groups,
     }
     return render(request, 'store/search_results.html', context)
 
 
+def search_autocomplete(request):
+    """JSON typeahead suggestions for the header search box"""
+    query = request.GET.get('q', '').strip()
+    return JsonResponse({'results': autocomplete.suggest(query[:50]) if query else []})
+
+
 def signup(request):
     """User registration with role selection"""
     if request.user.is_authenticated:
@@ -110,7 +124,7 @@ def signup(request):
             messages.success(request, f'Account created successfully! Welcome, {username}!')
             
             # Redirect all users to home page
-            return redirect('home')
+            return _merge_guest_cart(request, user, redirect('home'))
     else:
         form = UserRegistrationForm()
     return render(request, 'store/signup.html', {'form': form})
@@ -128,13 +142,25 @@ def login_view(request):
         if user is not None:
             login(request, user)
             messages.success(request, f'Welcome back, {username}!')
-            # Redirect all users to home page
-            return redirect('home')
+            # Back to where login was required (e.g. checkout), otherwise home
+            next_url = request.GET.get('next', '')
+            if not url_has_allowed_host_and_scheme(next_url, {request.get_host()}, request.is_secure()):
+                next_url = 'home'
+            return _merge_guest_cart(request, user, redirect(next_url))
         else:
             messages.error(request, 'Invalid username or password.')
     return render(request, 'store/login.html')
 
 
+def _merge_guest_cart(request, user, response):
+    """Move a guest cookie cart into the user's Cart and drop the cookie"""
+    if guest_cart.COOKIE_NAME in request.COOKIES:
+        if guest_cart.merge_into_cart(request, user):
+            invalidate_cart_summary(user.id)
+        guest_cart.clear(response)
+    return response
+
+
 def logout_view(request):
     """User logout"""
     from django.contrib.auth import logout
@@ -143,63 +169,64 @@ def logout_view(request):
     return redirect('home')
 
 
+@anonymous_page_cache(category_page_versions, params=('page', *facets.FACET_PARAMS))
 def category_products(request, category_slug):
     """Category-wise products page with pagination"""
     category = get_object_or_404(Category, slug=category_slug)
-    products = Product.objects.filter(category=category, stock_status='in_stock', approval_status='approved')
+    products = listings.category_products(category)
+    
+    filters = facets.parse_filters(request.GET)
+    counts = facets.cached_facet_counts(['category', category.pk], products, filters)
+    products = listings.filtered(products, filters)
     
-    # Pagination - 12 products per page
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination - 12 products per page, no COUNT(*) so deep crawls stay cheap
+    paginator = CursorPaginator(products, listings.CATEGORY_PER_PAGE, with_count=False)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
         'category': category,
         'page_obj': page_obj,
         'products': page_obj,
+        'total_results': counts['total'],
+        'facet_groups': facets.build_facets(request.GET, filters, counts),
+        'pagination_query': urlencode({name: request.GET[name] for name in facets.FACET_PARAMS if request.GET.get(name)}),
     }
     return render(request, 'store/category_products.html', context)
 
 
 def product_detail(request, product_id):
     """Product detail page with image gallery"""
-    # Only show approved products to non-sellers, or show to seller if it's their own product
+    # Anyone sees approved products; sellers also see their own regardless of approval status
+    visible = Q(approval_status='approved')
     if request.user.is_authenticated and request.user.role == 'seller':
-        # Sellers can view their own products regardless of approval status
-        product = get_object_or_404(Product, id=product_id)
-        if product.seller != request.user:
-            # If viewing another seller's product, must be approved
-            product = get_object_or_404(Product, id=product_id, approval_status='approved')
-    else:
-        # Non-sellers and anonymous users can only see approved products
-        product = get_object_or_404(Product, id=product_id, approval_status='approved')
-    images = product.images.all()
-    primary_image = images.filter(is_primary=True).first() or images.first()
-    if primary_image:
-        other_images = images.exclude(id=primary_image.id)
-    else:
-        other_images = images
+        visible |= Q(seller=request.user)
+    product = get_object_or_404(
+        Product.objects.filter(visible).prefetch_related(
+            Prefetch('images', queryset=ProductImage.objects.order_by('id')), 'videos'
+        ),
+        id=product_id,
+    )
+    # One fetch for the gallery, split in Python
+    images = list(product.images.all())
+    primary_image = next((image for image in images if image.is_primary), images[0] if images else None)
+    other_images = [image for image in images if image is not primary_image]
     
     # Get videos for the product
     videos = product.videos.all()
     
     # Calculate delivery date (7 days from now)
     delivery_date = timezone.now().date() + timedelta(days=7)
-    reviews = product.reviews.select_related('user').order_by('-created_at')
+    reviews = _review_page(product, request.GET.get('reviews'))
     review_form = None
     user_review = None
     can_review = False
     has_purchased = False
 
     if request.user.is_authenticated:
-        user_review = reviews.filter(user=request.user).first()
-        eligible_statuses = ['confirmed', 'shipped', 'delivered']
-        has_purchased = OrderItem.objects.filter(
-            order__user=request.user,
-            product=product,
-            order__status__in=eligible_statuses
-        ).exists()
-        can_review = has_purchased and product.seller != request.user
+        has_purchased = cached_has_purchased(request.user, product.pk)
+        can_review = has_purchased and product.seller_id != request.user.pk
+        if can_review:
+            user_review = product.reviews.filter(user=request.user).first()
 
         if request.method == 'POST':
             if can_review:
@@ -233,6 +260,28 @@ def product_detail(request, product_id):
     return render(request, 'store/product_detail.html', context)
 
 
+REVIEWS_PER_PAGE = 10
+
+
+def _review_page(product, cursor):
+    """One cursor page of a product's reviews, newest first (the total comes from product.rating_count)"""
+    reviews = Review.objects.filter(product=product).select_related('user')
+    return CursorPaginator(reviews, REVIEWS_PER_PAGE, with_count=False).get_page(cursor)
+
+
+def product_reviews(request, product_id):
+    """JSON page of review cards for the product page's "More reviews" button"""
+    visible = Q(approval_status='approved')
+    if request.user.is_authenticated:
+        visible |= Q(seller=request.user)
+    product = get_object_or_404(Product.objects.filter(visible).only('id'), id=product_id)
+    reviews = _review_page(product, request.GET.get('cursor'))
+    return JsonResponse({
+        'html': render_to_string('store/review_list.html', {'reviews': reviews}, request=request),
+        'next': reviews.next_page_number() if reviews.has_next() else None,
+    })
+
+
 @login_required
 def admin_page(request):
     """Admin page for sellers only"""
@@ -240,14 +289,15 @@ def admin_page(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('home')
     
-    products = Product.objects.filter(seller=request.user)
-    total_products = products.count()
-    total_sales = sum(product.total_sells for product in products)
+    products = listings.seller_products(request.user)
+    summary = sales.seller_summary(request.user)
     
     context = {
         'products': products,
-        'total_products': total_products,
-        'total_sales': total_sales,
+        'total_products': len(products),
+        'total_sales': summary['units'],
+        'total_revenue': summary['revenue'],
+        'sales_periods': summary['periods'],
     }
     return render(request, 'store/admin_page.html', context)
 
@@ -293,6 +343,72 @@ def add_category(request):
     return JsonResponse({'success': False, 'error': 'Invalid request'}, status=400)
 
 
+def _upload_status(upload):
+    status = {
+        'success': True,
+        'id': str(upload.pk),
+        'product': upload.product_id,
+        'received': upload.received,
+        'size': upload.size,
+        'chunk_size': uploads.CHUNK_SIZE,
+        'complete': upload.completed_at is not None,
+    }
+    attached = getattr(upload, 'attached', None)
+    if attached is not None:
+        status['url'] = (attached.image if upload.kind == 'image' else attached.video).url
+    return status
+
+
+@login_required
+def start_upload(request):
+    """Begin a chunked image/video upload for a draft product (creating the draft if needed)"""
+    if request.user.role != 'seller':
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request'}, status=405)
+    try:
+        upload = uploads.start(
+            request.user,
+            request.POST.get('kind'),
+            request.POST.get('filename'),
+            request.POST.get('size'),
+            product_id=request.POST.get('product') or None,
+        )
+    except uploads.UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+    return JsonResponse(_upload_status(upload), status=201)
+
+
+@login_required
+def upload_chunk(request, upload_id):
+    """GET: how much of the upload has arrived. PUT: the next chunk as the raw body. DELETE: abandon it."""
+    upload = ChunkedUpload.objects.filter(pk=upload_id, user=request.user).first()
+    if upload is None:
+        return JsonResponse({'success': False, 'error': 'Unknown upload'}, status=404)
+    if request.method == 'GET':
+        return JsonResponse(_upload_status(upload))
+    if request.method == 'DELETE':
+        if not upload.completed_at:
+            uploads.cancel(upload)
+        return JsonResponse({'success': True})
+    if request.method != 'PUT':
+        return JsonResponse({'success': False, 'error': 'Invalid request'}, status=405)
+
+    try:
+        offset, length = uploads.parse_content_range(request.headers.get('Content-Range'), upload)
+        content_length = request.headers.get('Content-Length') or '0'
+        if not content_length.isdigit() or int(content_length) != length:
+            raise uploads.UploadError('Content-Length does not match Content-Range.')
+        # Reads the body from the socket as it is written; request.body is never touched
+        upload = uploads.append(upload, offset, length, request)
+    except uploads.UploadError as e:
+        response = {'success': False, 'error': str(e)}
+        if e.status == 409:
+            response['received'] = upload.received
+        return JsonResponse(response, status=e.status)
+    return JsonResponse(_upload_status(upload))
+
+
 @login_required
 def add_product(request):
     """Add new product page for sellers"""
@@ -300,17 +416,24 @@ def add_product(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('home')
     
+    draft = None
     if request.method == 'POST':
-        form = ProductForm(request.POST, request.FILES)
+        # Files sent ahead through the chunked upload endpoint are already on a draft product
+        draft_id = request.POST.get('draft')
+        if draft_id and draft_id.isdigit():
+            draft = Product.objects.filter(id=draft_id, seller=request.user, approval_status='draft').first()
+        form = ProductForm(request.POST, request.FILES, instance=draft)
         if form.is_valid():
             # Check if at least one image is uploaded
             images = request.FILES.getlist('images')
-            if not images:
+            has_primary = draft is not None and draft.images.filter(is_primary=True).exists()
+            if not images and not has_primary:
                 messages.error(request, 'Please upload at least one product image.')
                 categories = Category.objects.all()
                 return render(request, 'store/add_product.html', {
                     'form': form,
                     'categories': categories,
+                    'draft': draft,
                 })
             
             product = form.save(commit=False)
@@ -323,7 +446,7 @@ def add_product(request):
                 ProductImage.objects.create(
                     product=product,
                     image=image,
-                    is_primary=(i == 0)
+                    is_primary=(i == 0 and not has_primary)
                 )
             
             # Handle video
@@ -340,6 +463,7 @@ def add_product(request):
     context = {
         'form': form,
         'categories': categories,
+        'draft': draft,
     }
     return render(request, 'store/add_product.html', context)
 
@@ -412,10 +536,9 @@ def settings(request):
     return render(request, 'store/settings.html', context)
 
 
-@login_required
 def add_to_cart(request, product_id):
-    """Add product to cart"""
-    product = get_object_or_404(Product, id=product_id)
+    """Add product to cart (guests get a signed-cookie cart until they log in)"""
+    product = get_object_or_404(Product.objects.only('id', 'approval_status', 'seller_id'), id=product_id)
     
     # Only approved products can be added to cart
     if product.approval_status != 'approved':
@@ -423,13 +546,21 @@ def add_to_cart(request, product_id):
         return redirect('product_detail', product_id=product_id)
     
     # Prevent sellers from adding their own products to cart
-    if product.seller == request.user:
+    if product.seller_id == request.user.id:
         messages.error(request, 'You cannot add your own product to cart.')
         return redirect('product_detail', product_id=product_id)
     
     if request.method == 'POST':
         quantity = int(request.POST.get('quantity', 1))
         
+        if not request.user.is_authenticated:
+            items = guest_cart.load(request)
+            items[product.id] = min(items.pop(product.id, 0) + quantity, guest_cart.MAX_QUANTITY)
+            messages.success(request, 'Product added to cart!')
+            response = redirect('cart')
+            guest_cart.save(response, items)
+            return response
+        
         cart_item, created = Cart.objects.get_or_create(
             user=request.user,
             product=product,
@@ -439,6 +570,7 @@ def add_to_cart(request, product_id):
         if not created:
             cart_item.quantity += quantity
             cart_item.save()
+        invalidate_cart_summary(request.user.id)
         
         messages.success(request, 'Product added to cart!')
         return redirect('cart')
@@ -446,11 +578,19 @@ def add_to_cart(request, product_id):
     return redirect('product_detail', product_id=product_id)
 
 
-@login_required
 def cart(request):
-    """Cart page - accessible to all authenticated users"""
-    cart_items = Cart.objects.filter(user=request.user)
-    total_amount = sum(item.get_total_price() for item in cart_items)
+    """Cart page - guests see their cookie cart"""
+    if not request.user.is_authenticated:
+        cart_items = guest_cart.items_for_display(guest_cart.load(request))
+        return render(request, 'store/cart.html', {
+            'cart_items': cart_items,
+            'total_amount': sum(item.line_total for item in cart_items),
+        })
+    
+    cart_items = Cart.objects.filter(user=request.user).with_line_totals().select_related('product').prefetch_related(
+        primary_image_prefetch('product__images')
+    )
+    total_amount = sum(item.line_total for item in cart_items)
     
     context = {
         'cart_items': cart_items,
@@ -459,9 +599,12 @@ def cart(request):
     return render(request, 'store/cart.html', context)
 
 
-@login_required
 def update_cart(request, cart_id):
-    """Update cart item quantity"""
+    """Update cart item quantity (for guests cart_id is the product id)"""
+    if not request.user.is_authenticated:
+        quantity = int(request.POST.get('quantity', 1)) if request.method == 'POST' else None
+        return _update_guest_cart(request, cart_id, quantity)
+    
     cart_item = get_object_or_404(Cart, id=cart_id, user=request.user)
     
     if request.method == 'POST':
@@ -473,19 +616,43 @@ def update_cart(request, cart_id):
         else:
             cart_item.delete()
             messages.success(request, 'Item removed from cart!')
+        invalidate_cart_summary(request.user.id)
+        # The hold no longer matches the cart; opening checkout reserves the new quantity
+        reservations.release(request.user, [cart_item.product_id])
     
     return redirect('cart')
 
 
-@login_required
 def remove_from_cart(request, cart_id):
-    """Remove item from cart"""
+    """Remove item from cart (for guests cart_id is the product id)"""
+    if not request.user.is_authenticated:
+        return _update_guest_cart(request, cart_id, 0)
+    
     cart_item = get_object_or_404(Cart, id=cart_id, user=request.user)
     cart_item.delete()
+    invalidate_cart_summary(request.user.id)
+    reservations.release(request.user, [cart_item.product_id])
     messages.success(request, 'Item removed from cart!')
     return redirect('cart')
 
 
+def _update_guest_cart(request, product_id, quantity):
+    """Set (or with quantity 0, remove) a product in the guest cookie cart"""
+    response = redirect('cart')
+    if quantity is None:
+        return response
+    items = guest_cart.load(request)
+    if product_id in items:
+        if quantity > 0:
+            items[product_id] = min(quantity, guest_cart.MAX_QUANTITY)
+            messages.success(request, 'Cart updated!')
+        else:
+            del items[product_id]
+            messages.success(request, 'Item removed from cart!')
+        guest_cart.save(response, items)
+    return response
+
+
 @login_required
 def add_to_wishlist(request, product_id):
     """Add product to wishlist"""
@@ -515,7 +682,9 @@ def remove_from_wishlist(request, product_id):
 @login_required
 def wishlist(request):
     """Wishlist page - accessible to all authenticated users"""
-    wishlist_items = Wishlist.objects.filter(user=request.user)
+    wishlist_items = Wishlist.objects.filter(user=request.user).select_related('product').prefetch_related(
+        primary_image_prefetch('product__images')
+    )
     
     context = {
         'wishlist_items': wishlist_items,
@@ -528,10 +697,20 @@ def my_orders(request):
     """List of user's orders (for both buyers and sellers)"""
     # For buyers: show orders they placed
     # For sellers: show orders for their products (if needed in future)
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
+    item_counts = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+        count=Count('id')
+    ).values('count')
+    orders = Order.objects.filter(user=request.user).annotate(
+        item_count=Subquery(item_counts)
+    ).prefetch_related(order_items_preview_prefetch(3))
+    
+    paginator = CursorPaginator(orders, 10, with_count=False)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
-        'orders': orders,
+        'orders': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
     }
     return render(request, 'store/my_orders.html', context)
 
@@ -539,7 +718,10 @@ def my_orders(request):
 @login_required
 def order_detail(request, order_id):
     """Order detail page"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    items = OrderItem.objects.select_related('product').prefetch_related(primary_image_prefetch('product__images'))
+    order = get_object_or_404(
+        Order.objects.prefetch_related(Prefetch('items', queryset=items)), id=order_id, user=request.user
+    )
     
     context = {
         'order': order,
@@ -550,18 +732,25 @@ def order_detail(request, order_id):
 @login_required
 def buy_now(request):
     """Buy/Payment page"""
-    cart_items = Cart.objects.filter(user=request.user)
+    submission_key = request.POST.get('submission_key', '')[:64]
+    if request.method == 'POST':
+        # Replayed submission (double-click, network retry): go straight to the order
+        order_id = checkout.submitted_order_id(request.user, submission_key)
+        if order_id is not None:
+            return redirect('order_confirmation', order_id=order_id)
+    
+    cart_items = Cart.objects.filter(user=request.user).with_line_totals().select_related('product')
     if not cart_items:
         messages.error(request, 'Your cart is empty!')
         return redirect('cart')
     
     # Check if user is trying to buy their own products
-    own_products = [item for item in cart_items if item.product.seller == request.user]
+    own_products = [item for item in cart_items if item.product.seller_id == request.user.id]
     if own_products:
         messages.error(request, 'You cannot buy your own products. Please remove them from cart.')
         return redirect('cart')
     
-    total_amount = sum(item.get_total_price() for item in cart_items)
+    total_amount = sum(item.line_total for item in cart_items)
     delivery_date = timezone.now().date() + timedelta(days=7)
     
     if request.method == 'POST':
@@ -575,69 +764,38 @@ def buy_now(request):
                 'cart_items': cart_items,
                 'total_amount': total_amount,
                 'delivery_date': delivery_date,
+                'submission_key': submission_key or checkout.new_submission_key(),
             })
         
-        # Double-check: prevent buying own products
-        own_products_check = [item for item in cart_items if item.product.seller == request.user]
-        if own_products_check:
-            messages.error(request, 'You cannot buy your own products. Please remove them from cart.')
+        # Stock is re-checked against locked rows inside the checkout transaction
+        try:
+            order = checkout.place_order(
+                request.user, address, pin_code, payment_method, delivery_date, submission_key=submission_key
+            )
+        except checkout.EmptyCart:
+            messages.error(request, 'Your cart is empty!')
             return redirect('cart')
-        
-        # Verify stock availability
-        insufficient_items = []
-        for cart_item in cart_items:
-            available_quantity = cart_item.product.quantity
-            if available_quantity < cart_item.quantity or cart_item.product.stock_status == 'out_of_stock':
-                insufficient_items.append(f"{cart_item.product.name} (available: {available_quantity})")
-        
-        if insufficient_items:
+        except checkout.InsufficientStock as e:
             messages.error(
                 request,
-                'Insufficient stock for: ' + ', '.join(insufficient_items)
+                'Insufficient stock for: ' + ', '.join(e.items)
             )
             return redirect('cart')
         
-        # Generate order number
-        order_number = 'ORD' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-        
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            order_number=order_number,
-            address=address,
-            pin_code=pin_code,
-            payment_method=payment_method,
-            total_amount=total_amount,
-            delivery_date=delivery_date,
-            status='confirmed'
-        )
-        
-        # Create order items
-        for cart_item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-            
-            # Update product sales and quantity
-            cart_item.product.total_sells += cart_item.quantity
-            cart_item.product.quantity -= cart_item.quantity
-            if cart_item.product.quantity <= 0:
-                cart_item.product.stock_status = 'out_of_stock'
-            cart_item.product.save()
-        
-        # Clear cart
-        cart_items.delete()
-        
-        messages.success(request, f'Order placed successfully! Order Number: {order_number}')
+        messages.success(request, f'Order placed successfully! Order Number: {order.order_number}')
         return redirect('order_confirmation', order_id=order.id)
     
+    # Opening checkout holds the cart's stock for reservations.HOLD_MINUTES
+    shortfalls = reservations.reserve_cart(request.user)
+    if shortfalls:
+        messages.error(request, 'Insufficient stock for: ' + ', '.join(shortfalls))
+        return redirect('cart')
+    
     context = {
         'cart_items': cart_items,
         'total_amount': total_amount,
         'delivery_date': delivery_date,
+        'submission_key': checkout.new_submission_key(),
     }
     return render(request, 'store/buy.html', context)
 
@@ -653,6 +811,37 @@ def order_confirmation(request, order_id):
     return render(request, 'store/order_confirmation.html', context)
 
 
+@login_required
+def export_data(request, dataset):
+    """Stream orders, order items or products as CSV or JSON Lines.
+
+    Staff export everything, sellers only rows involving their own products.
+    Optional filters: since/until (YYYY-MM-DD, inclusive) and status.
+    """
+    if request.user.role != 'seller' and not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('home')
+    
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest('Unknown format, use csv or jsonl.')
+    try:
+        headers, rows = exports.export_rows(
+            dataset,
+            request.user,
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+            status=request.GET.get('status'),
+        )
+    except exports.ExportError as e:
+        return HttpResponseBadRequest(str(e))
+    
+    response = StreamingHttpResponse(exports.stream(fmt, headers, rows), content_type=exports.FORMATS[fmt])
+    filename = f'{dataset}-{timezone.localdate():%Y%m%d}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def pending_products(request):
     """Admin page to view pending products for approval"""
@@ -660,14 +849,38 @@ def pending_products(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('home')
     
-    pending_products_list = Product.objects.filter(approval_status='pending').order_by('-created_at')
+    pending_products_list = listings.pending_products()
+    paginator = CursorPaginator(pending_products_list, listings.PENDING_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
-        'pending_products': pending_products_list,
+        'pending_products': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
     }
     return render(request, 'store/pending_products.html', context)
 
 
+@login_required
+def moderate_products(request):
+    """Approve or reject the selected pending products at once - Admin only"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        messages.error(request, 'You do not have permission to perform this action.')
+        return redirect('home')
+    
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        product_ids = [value for value in request.POST.getlist('product_ids') if value.isdigit()]
+        if action not in ('approve', 'reject') or not product_ids:
+            messages.error(request, 'Select at least one product and an action.')
+        else:
+            status = 'approved' if action == 'approve' else 'rejected'
+            changed = moderation.set_approval(product_ids, status)
+            messages.success(request, f'{changed} product{"s" if changed != 1 else ""} {status}.')
+    
+    return redirect('pending_products')
+
+
 @login_required
 def approve_product(request, product_id):
     """Approve a product - Admin only"""
@@ -675,9 +888,8 @@ def approve_product(request, product_id):
         messages.error(request, 'You do not have permission to perform this action.')
         return redirect('home')
     
-    product = get_object_or_404(Product, id=product_id)
-    product.approval_status = 'approved'
-    product.save()
+    product = get_object_or_404(Product.objects.only('id', 'name'), id=product_id)
+    moderation.set_approval([product.id], 'approved')
     
     messages.success(request, f'Product "{product.name}" has been approved and is now live!')
     return redirect('pending_products')
@@ -690,10 +902,14 @@ def reject_product(request, product_id):
         messages.error(request, 'You do not have permission to perform this action.')
         return redirect('home')
     
-    product = get_object_or_404(Product, id=product_id)
-    product.approval_status = 'rejected'
-    product.save()
+    product = get_object_or_404(Product.objects.only('id', 'name'), id=product_id)
+    moderation.set_approval([product.id], 'rejected')
     
     messages.success(request, f'Product "{product.name}" has been rejected.')
     return redirect('pending_products')
 
+
+@require_safe
+def serve_media(request, path):
+    """Uploaded media with Range, ETag/Last-Modified revalidation and cache headers (see media.py)"""
+    return media.serve(request, path)